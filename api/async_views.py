@@ -0,0 +1,120 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.functional import classproperty
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Serve GET/HEAD of a DRF generic view natively async.
+
+    Under ASGI (blogproject/asgi.py) the read path then never leaves the
+    event loop: rows are fetched with the async ORM, serialized from data
+    that is already loaded and JSON is rendered in place, so one worker can
+    keep many slow clients in flight. Every other method goes through DRF's
+    normal sync dispatch in a worker thread.
+
+    Authentication is left lazy on reads (the read endpoints are public);
+    anything that needs request.user must resolve it off the event loop.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request, *args, **kwargs)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render_in_place(self.response)
+
+    def perform_authentication(self, request):
+        # Sync DB lookups (session, JWT user) can't run here; stay lazy
+        if request.method not in ('GET', 'HEAD'):
+            super().perform_authentication(request)
+
+    async def aresolve_user(self, request):
+        """
+        request.user from an async read. Requests without credentials are
+        anonymous straight away; otherwise the authenticators run in a thread.
+        """
+        if 'HTTP_AUTHORIZATION' not in request.META and settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return AnonymousUser()
+        return await sync_to_async(lambda: request.user)()
+
+    async def aget_extra_context(self, rows):
+        """Serializer context that needs queries, built async before serializing `rows`."""
+        return {}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(getattr(self, 'prepared_context', {}))
+        return context
+
+    def render_in_place(self, response):
+        """
+        Render JSON now and hand Django a plain HttpResponse; a DRF Response
+        would otherwise be rendered in a thread. Other renderers (the
+        browsable API) may query the DB and are left to Django.
+        """
+        if not isinstance(getattr(response, 'accepted_renderer', None), JSONRenderer):
+            return response
+        response.render()
+        plain = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            plain[header] = value
+        plain.cookies = response.cookies
+        return plain
+
+
+class AsyncListMixin(AsyncReadMixin):
+    """Async list(): async pagination, then serialization of the loaded page."""
+
+    def get_list_queryset(self):
+        """The rows to page through; may be a values() queryset (see BlogList)."""
+        return self.filter_queryset(self.get_queryset())
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            self.prepared_context = await self.aget_extra_context(page)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        rows = [row async for row in queryset]
+        self.prepared_context = await self.aget_extra_context(rows)
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+class AsyncRetrieveMixin(AsyncReadMixin):
+    """Async retrieve(): the object's queryset must load every related row it serializes."""
+
+    def get_retrieve_queryset(self):
+        """The queryset the object is read from; may load fewer columns (see BlogDetail)."""
+        return self.filter_queryset(self.get_queryset())
+
+    async def aget_object(self):
+        queryset = self.get_retrieve_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = await aget_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        self.prepared_context = await self.aget_extra_context([instance])
+        return Response(self.get_serializer(instance).data)
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Seconds a cached user stays valid. Saves in this worker drop the entry
+# at once; other workers see the change once their copy expires.
+USER_CACHE_TTL = getattr(settings, 'JWT_USER_CACHE_TTL', 60)
+
+# Most users one worker keeps; the least recently used are dropped first
+USER_CACHE_SIZE = getattr(settings, 'JWT_USER_CACHE_SIZE', 10000)
+
+# Columns kept per user. Any other field (e.g. password) is deferred and
+# loaded from the database if something reads it.
+USER_CACHE_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+class UserCache:
+    """
+    Per-process, TTL-bounded map of user id -> the USER_CACHE_FIELDS values,
+    with hit / miss / invalidation counters.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, values):
+        with self.lock:
+            self.entries[str(user_id)] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(str(user_id))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(str(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache()
+
+
+def _cached_attnames(model):
+    # Model.from_db() takes values in concrete field order
+    return tuple(f.attname for f in model._meta.concrete_fields if f.name in USER_CACHE_FIELDS)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from `user_cache`
+    instead of loading the User row on every request. Inactive and deleted
+    users are rejected exactly as before; with CHECK_REVOKE_TOKEN the
+    password hash is read on demand, so that check still hits the database.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        attnames = _cached_attnames(self.user_model)
+        values = user_cache.get(user_id)
+        if values is None:
+            user = self.load_user(user_id)
+            values = tuple(getattr(user, attname) for attname in attnames)
+            user_cache.set(user_id, values)
+        # A fresh instance per request, so nothing set on request.user leaks
+        user = self.user_model.from_db(router.db_for_read(self.user_model), attnames, values)
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            # password is deferred: this reads it from the database
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def load_user(self, user_id):
+        try:
+            return self.user_model.objects.only(*USER_CACHE_FIELDS).get(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication as the same bearer scheme (jwtAuth)."""
+    target_class = CachedJWTAuthentication
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Any save (password change, is_active, profile edits, last_login) or delete
+    user_cache.invalidate(getattr(instance, jwt_settings.USER_ID_FIELD))
+
+
+post_save.connect(invalidate_cached_user, sender=get_user_model(), dispatch_uid='api.invalidate_cached_user')
+post_delete.connect(invalidate_cached_user, sender=get_user_model(), dispatch_uid='api.invalidate_cached_user_delete')
@@ -0,0 +1,90 @@
+import hashlib
+from calendar import timegm
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalMixin:
+    """Conditional requests (ETag / Last-Modified) for generic API views.
+
+    Validators come from one aggregate query over the view's queryset: the
+    row count and the newest value of each `validator_fields` timestamp
+    (updated_at, plus e.g. counters_changed_at for stored counters that
+    change without touching updated_at). No rows are loaded, so a poll that
+    ends in 304 costs a single small query and no serialization. The ETag also covers deletions and the query string; it
+    takes precedence over If-Modified-Since when a client sends both.
+
+    Write handlers wrapped in conditional_write() honour If-Match /
+    If-Unmodified-Since: the row is locked, the validators re-checked and 412
+    returned on a mismatch.
+    """
+    validator_fields = ('updated_at',)
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs and getattr(self, 'lookup_field', None):
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset.order_by()
+
+    def get_validator_aggregates(self):
+        aggregates = {field: Max(field) for field in self.validator_fields}
+        aggregates['rows'] = Count('pk')
+        return aggregates
+
+    def get_validators(self, request):
+        """Returns (etag, last_modified timestamp), or (None, None) when nothing matches."""
+        values = self.get_validator_queryset().aggregate(**self.get_validator_aggregates())
+        return self.make_validators(request, values)
+
+    async def aget_validators(self, request):
+        values = await self.get_validator_queryset().aaggregate(**self.get_validator_aggregates())
+        return self.make_validators(request, values)
+
+    def make_validators(self, request, values):
+        if not values['rows']:
+            # Let the view answer (e.g. 404 / empty list) without validators
+            return None, None
+        renderer = getattr(request, 'accepted_renderer', None)
+        parts = [str(values[key]) for key in sorted(values)]
+        parts += [request.path, request.GET.urlencode(), getattr(renderer, 'format', '')]
+        etag = '"%s"' % hashlib.md5('|'.join(parts).encode()).hexdigest()
+        newest = max((values[field] for field in self.validator_fields if values[field]), default=None)
+        last_modified = timegm(newest.utctimetuple()) if newest else None
+        return etag, last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        # Reads are async (see api/async_views.py); writes stay sync below
+        etag, last_modified = await self.aget_validators(request)
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return self.set_validators(not_modified, etag, last_modified)
+        response = await super().get(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def conditional_write(self, write, request, *args, **kwargs):
+        """Run the `write` handler only if the client's preconditions still hold."""
+        if 'HTTP_IF_MATCH' not in request.META and 'HTTP_IF_UNMODIFIED_SINCE' not in request.META:
+            return write(request, *args, **kwargs)
+        with transaction.atomic():
+            # Hold the row so nothing can change it between the check and the write
+            list(self.get_validator_queryset().select_for_update().values_list('pk', flat=True))
+            etag, last_modified = self.get_validators(request)
+            if etag:
+                failed = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if failed is not None:
+                    return failed
+            response = write(request, *args, **kwargs)
+        if request.method != 'DELETE' and response.status_code < 300:
+            self.set_validators(response, *self.get_validators(request))
+        return response
@@ -0,0 +1,231 @@
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from blogapp.search import MAX_SEARCH_OFFSET
+from utils.common import encode_cursor, decode_cursor
+
+
+class KeysetPagination(BasePagination):
+    """Opaque cursor pagination keyed on (created_at, id).
+
+    Pages are selected with a WHERE on the ordering key instead of OFFSET and
+    no COUNT(*) is issued, so page cost stays flat however far a client
+    scrolls. Old clients can still get the page-number style by passing
+    ?page=N (or ?pagination=page).
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    legacy_query_param = 'page'
+
+    def __init__(self):
+        self.legacy = None
+
+    def wants_legacy(self, request):
+        return (self.legacy_query_param in request.query_params
+                or request.query_params.get('pagination') == 'page')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = queryset.order_by(*self.ordering)
+        if self.wants_legacy(request):
+            self.legacy = PageNumberPagination()
+            self.legacy.page_size = self.get_page_size(request)
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        queryset, page_size = self._window(queryset, request)
+        return self._finish(list(queryset[:page_size + 1]), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views; rows come from async iteration."""
+        queryset = queryset.order_by(*self.ordering)
+        if self.wants_legacy(request):
+            self.legacy = PageNumberPagination()
+            self.legacy.page_size = self.get_page_size(request)
+            # Django's Paginator (COUNT + slice) is sync only
+            return await sync_to_async(self.legacy.paginate_queryset)(queryset, request, view)
+
+        queryset, page_size = self._window(queryset, request)
+        return self._finish([row async for row in queryset[:page_size + 1]], page_size)
+
+    def _window(self, queryset, request):
+        # Filter and order the queryset to the rows after the cursor
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position = decode_cursor(request.query_params.get(self.cursor_query_param))
+        self.position = position
+        self.reverse = bool(position and position[2])
+
+        if position:
+            created_at, pk, _ = position
+            # Rows "after" the cursor in walk direction; for a descending key
+            # walking forwards that means smaller values
+            op = 'lt' if self.ordering[0].startswith('-') != self.reverse else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'created_at__{op}': created_at}) | Q(created_at=created_at, **{f'pk__{op}': pk})
+            )
+        if self.reverse:
+            queryset = queryset.reverse()
+        return queryset, page_size
+
+    def _finish(self, rows, page_size):
+        has_extra = len(rows) > page_size
+        rows = rows[:page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Walking forwards there is always a way back once we left page one;
+        # walking backwards there is always a way forward again
+        self.has_next = has_extra if not self.reverse else True
+        self.has_previous = bool(self.position) if not self.reverse else has_extra
+        self.page = rows
+        return rows
+
+    def _cursor_link(self, row, reverse):
+        # Rows are model instances or values() dicts
+        if isinstance(row, dict):
+            token = encode_cursor(row['created_at'], row['id'], reverse=reverse)
+        else:
+            token = encode_cursor(row.created_at, row.pk, reverse=reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.page or not self.has_next:
+            return None
+        return self._cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.page or not self.has_previous:
+            return None
+        return self._cursor_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor taken from a previous next/previous link.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.legacy_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Legacy page number; switches the response to count/next/previous/results.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class CommentKeysetPagination(KeysetPagination):
+    """Oldest-first variant used for comment threads."""
+    ordering = ('created_at', 'id')
+
+
+class SearchPagination(BasePagination):
+    """Page-number pagination over ranked search hits.
+
+    Works on any sliceable (blogapp.search.SearchResults); one extra hit is
+    fetched to know whether a next page exists, so no COUNT is needed.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    page_query_param = 'page'
+
+    get_page_size = KeysetPagination.get_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            self.number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except ValueError:
+            self.number = 1
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        start = (self.number - 1) * page_size
+        if start > MAX_SEARCH_OFFSET:
+            raise NotFound('Invalid page.')
+        rows = list(queryset[start:start + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.number == 1:
+            return None
+        if self.number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    get_paginated_response_schema = KeysetPagination.get_paginated_response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.page_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Page number of the ranked results.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
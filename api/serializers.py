@@ -1,4 +1,13 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.encoding import iri_to_uri
 from rest_framework import serializers
+from authentication.backends import normalize_email
+from blogapp.database_logic import liked_blog_ids
+from utils.common import get_default_blog_image
+from utils.images import VARIANT_FORMATS, srcset, srcset_builder
+from utils.uploads import upload_rejection
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -6,19 +15,23 @@ class RegisterSerializer(serializers.Serializer):
 	email = serializers.EmailField(required=True)
 	password = serializers.CharField(write_only=True, min_length=8)
 
+	def validate_email(self, value):
+		return normalize_email(value)
+
 	def create(self, validated_data):
 		# Create the user using Django's create_user helper
 		from django.contrib.auth.models import User
 		email = validated_data.get('email')
-		# Use email as username to keep uniqueness; if username exists, raise
-		if User.objects.filter(username=email).exists():
+		# Email doubles as username; both are unique in the database
+		try:
+			with transaction.atomic():
+				return User.objects.create_user(
+					username=email,
+					email=email,
+					password=validated_data.get('password')
+				)
+		except IntegrityError:
 			raise serializers.ValidationError({'email': 'A user with this email already exists.'})
-		user = User.objects.create_user(
-			username=email,
-			email=email,
-			password=validated_data.get('password')
-		)
-		return user
 
 
 class UserPublicSerializer(serializers.Serializer):
@@ -47,15 +60,56 @@ class LoginResponseSerializer(serializers.Serializer):
 
 
 
+class BlogListSerializer(serializers.ListSerializer):
+	"""Looks up the viewer's likes for the whole page in one query (see liked_by_me)."""
+
+	def to_representation(self, data):
+		rows = list(data.all() if hasattr(data, 'all') else data)
+		if 'liked_ids' not in self.context and 'liked_by_me' in self.child.fields:
+			request = self.context.get('request')
+			user = getattr(request, 'user', None)
+			self.context['liked_ids'] = liked_blog_ids(user, [row.pk for row in rows]) if user else set()
+		return super().to_representation(rows)
+
+
 class BlogSerializer(serializers.Serializer):
+	"""Read representation of a blog. `fields` (names, see BLOG_FIELDS) limits the output."""
 	id = serializers.IntegerField(read_only=True)
 	title = serializers.CharField()
 	author = serializers.CharField(source='author.username', read_only=True)
 	image_url = serializers.SerializerMethodField()
+	image_srcset = serializers.SerializerMethodField()
 	content = serializers.CharField()
+	# Stored teaser and stats (Blog.update_summary); list responses send them instead of content
+	excerpt = serializers.CharField(read_only=True)
+	word_count = serializers.IntegerField(read_only=True)
+	reading_time = serializers.IntegerField(read_only=True, help_text='Minutes')
 	status = serializers.CharField()
 	created_at = serializers.DateTimeField(read_only=True)
 	updated_at = serializers.DateTimeField(read_only=True)
+	# Stored counters maintained on Like/Comment writes; never counted here
+	like_count = serializers.IntegerField(read_only=True)
+	comment_count = serializers.IntegerField(read_only=True)
+	# Whether the requesting user liked the blog; batched per page via context['liked_ids']
+	liked_by_me = serializers.SerializerMethodField()
+
+	class Meta:
+		list_serializer_class = BlogListSerializer
+
+	def __init__(self, *args, fields=None, **kwargs):
+		super().__init__(*args, **kwargs)
+		if fields is not None:
+			for name in set(self.fields) - set(fields):
+				self.fields.pop(name)
+
+	def get_liked_by_me(self, obj) -> bool:
+		liked_ids = self.context.get('liked_ids')
+		if liked_ids is None:
+			# Single object without a prepared context: one small query
+			request = self.context.get('request')
+			user = getattr(request, 'user', None)
+			liked_ids = liked_blog_ids(user, [obj.pk]) if user else set()
+		return obj.pk in liked_ids
 
 	def get_image_url(self, obj):
 		# Use Blog.get_image_url if available else fallback to field url
@@ -77,10 +131,125 @@ class BlogSerializer(serializers.Serializer):
 
 		return url
 
+	def get_image_srcset(self, obj):
+		# srcset strings of the resized variants, keyed by format ('webp', 'jpeg')
+		request = self.context.get('request') if hasattr(self, 'context') else None
+		base_url = ''
+		if request and not settings.MEDIA_URL.startswith('http'):
+			base_url = request.build_absolute_uri('/')[:-1]
+		name = obj.get_image_name()
+		return {fmt: srcset(name, fmt, base_url) for fmt in VARIANT_FORMATS}
+
+
+# Every field a blog representation can have, in output order
+BLOG_FIELDS = tuple(BlogSerializer().fields)
+
+
+class FastBlogListSerializer:
+	"""Read-only stand-in for BlogSerializer(many=True) over values() rows.
+
+	Rows are plain dicts (see api.sparse.values_columns), so no model
+	instances, lazy author lookups or per-row build_absolute_uri() calls are
+	involved: the absolute URL prefix is worked out once per page. `data` is
+	identical to what BlogSerializer produces for the same blogs and `fields`
+	(see api/tests.py and scripts/bench_blog_list.py).
+	"""
+
+	def __init__(self, rows, context=None, fields=BLOG_FIELDS):
+		self.rows = rows
+		self.context = context or {}
+		self.fields = [name for name in BLOG_FIELDS if name in fields]
+
+	def _absolute(self, url, prefix, request):
+		# request.build_absolute_uri() for the common case of a site-absolute path
+		if url.startswith('/') and not url.startswith('//') and '/./' not in url and '/../' not in url:
+			return iri_to_uri(prefix + url)
+		return request.build_absolute_uri(url)
+
+	def get_getters(self, rows):
+		"""(name, function of a row) for every output field, set up once per page."""
+		from blogapp.models import Blog
+
+		request = self.context.get('request')
+		prefix = request.build_absolute_uri('/')[:-1] if request else ''
+		storage = Blog._meta.get_field('image').storage
+		# Same formatting as BlogSerializer's DateTimeFields, timezone resolved once
+		datetime = serializers.DateTimeField(
+			default_timezone=timezone.get_current_timezone() if settings.USE_TZ else None
+		).to_representation
+
+		def image_name(row):
+			return row['image'] or get_default_blog_image(row['id'])
+
+		def image_url(row):
+			url = storage.url(row['image']) if row['image'] else f"/media/{image_name(row)}"
+			if request and not url.startswith('http'):
+				url = self._absolute(url, prefix, request)
+			return url
+
+		srcset_base = prefix if not settings.MEDIA_URL.startswith('http') else ''
+		srcsets = [(fmt, srcset_builder(fmt, srcset_base)) for fmt in VARIANT_FORMATS]
+
+		def image_srcset(row):
+			name = image_name(row)
+			return {fmt: build(name) for fmt, build in srcsets}
+
+		getters = {
+			'id': lambda row: row['id'],
+			'title': lambda row: str(row['title']),
+			'author': lambda row: str(row['author__username']),
+			'image_url': image_url,
+			'image_srcset': image_srcset,
+			'content': lambda row: str(row['content']),
+			'excerpt': lambda row: str(row['excerpt']),
+			'word_count': lambda row: row['word_count'],
+			'reading_time': lambda row: row['reading_time'],
+			'status': lambda row: str(row['status']),
+			'created_at': lambda row: datetime(row['created_at']),
+			'updated_at': lambda row: datetime(row['updated_at']),
+			'like_count': lambda row: row['like_count'],
+			'comment_count': lambda row: row['comment_count'],
+		}
+		if 'liked_by_me' in self.fields:
+			liked_ids = self.context.get('liked_ids')
+			if liked_ids is None:
+				user = getattr(request, 'user', None)
+				liked_ids = liked_blog_ids(user, [row['id'] for row in rows]) if user else set()
+			getters['liked_by_me'] = lambda row: row['id'] in liked_ids
+		return [(name, getters[name]) for name in self.fields]
+
+	@property
+	def data(self):
+		rows = list(self.rows)
+		getters = self.get_getters(rows)
+		return [{name: get(row) for name, get in getters} for row in rows]
 
-class BlogCreateSerializer(serializers.ModelSerializer):
+
+class StreamedImageField(serializers.ImageField):
+	"""ImageField that trusts uploads already sniffed and verified by
+	utils.uploads.ImageUploadHandler instead of decoding them with Pillow a second time."""
+
+	def to_internal_value(self, data):
+		if getattr(data, 'sniffed_content_type', None):
+			return serializers.FileField.to_internal_value(self, data)
+		return super().to_internal_value(data)
+
+
+class UploadRejectionMixin:
+	"""Report images dropped by the upload handler (wrong type / too large) as field errors."""
+
+	def validate(self, attrs):
+		request = self.context.get('request')
+		reason = upload_rejection(request, 'image') if request is not None else None
+		if reason:
+			raise serializers.ValidationError({'image': [reason]})
+		return super().validate(attrs)
+
+
+class BlogCreateSerializer(UploadRejectionMixin, serializers.ModelSerializer):
 	"""Serializer for creating Blog instances. Accepts an author id to assign ownership."""
 	author = serializers.IntegerField(write_only=True, required=True)
+	image = StreamedImageField(required=False, allow_null=True)
 
 	class Meta:
 		model = __import__('blogapp.models', fromlist=['Blog']).Blog
@@ -102,13 +271,65 @@ class BlogCreateSerializer(serializers.ModelSerializer):
 		return blog
 
 
-class BlogUpdateSerializer(serializers.ModelSerializer):
+class BlogUpdateSerializer(UploadRejectionMixin, serializers.ModelSerializer):
 	"""Serializer for updating Blog instances. Author is not writable here."""
+	image = StreamedImageField(required=False, allow_null=True)
+
 	class Meta:
 		model = __import__('blogapp.models', fromlist=['Blog']).Blog
 		fields = ['title', 'content', 'image', 'status']
 
 
+class UserCacheStatsSerializer(serializers.Serializer):
+	"""Counters of this worker's JWT user cache (api.authentication.user_cache)."""
+	size = serializers.IntegerField()
+	hits = serializers.IntegerField()
+	misses = serializers.IntegerField()
+	invalidations = serializers.IntegerField()
+	hit_ratio = serializers.FloatField()
+
+
+class LikeStateSerializer(serializers.Serializer):
+	liked = serializers.BooleanField()
+	like_count = serializers.IntegerField()
+
+
+# Largest number of items accepted by one bulk request
+BULK_MAX_ITEMS = 500
+
+
+class BulkIdsSerializer(serializers.Serializer):
+	"""Blog ids for the bulk publish / draft / delete endpoints."""
+	ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkBlogItemSerializer(serializers.Serializer):
+	"""One blog of a bulk create. `author` defaults to the requesting user."""
+	title = serializers.CharField(max_length=200)
+	content = serializers.CharField()
+	status = serializers.ChoiceField(choices=['draft', 'published'], default='draft')
+	author = serializers.IntegerField(required=False)
+
+
+class BulkCreateSerializer(serializers.Serializer):
+	# Items are validated one by one in the view so each gets its own result
+	blogs = serializers.ListField(child=serializers.DictField(), min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkResultSerializer(serializers.Serializer):
+	"""Per-item outcome of a bulk request, in request order."""
+	id = serializers.IntegerField(allow_null=True)
+	ok = serializers.BooleanField()
+	changed = serializers.BooleanField(required=False)
+	error = serializers.CharField(required=False)
+	errors = serializers.DictField(required=False)
+	blog = BlogSerializer(required=False)
+
+
+class BulkResponseSerializer(serializers.Serializer):
+	results = BulkResultSerializer(many=True)
+
+
 class CommentSerializer(serializers.Serializer):
 	id = serializers.IntegerField(read_only=True)
 	user = serializers.CharField(source='user.username', read_only=True)
@@ -1,3 +1,512 @@
-from django.test import TestCase
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from asgiref.sync import iscoroutinefunction
+from django.test import RequestFactory, TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from blogapp.models import Blog, Comment, Like
+from blogapp.search import MAX_SEARCH_OFFSET, SearchResults
+from blogapp.tests import MediaRootMixin, image_bytes
+from .authentication import CachedJWTAuthentication, user_cache
+from .views import BlogDetail, BlogList, CommentsList
+from .serializers import BLOG_FIELDS, BlogSerializer, FastBlogListSerializer
+from .sparse import only_columns, values_columns
 
-# Create your tests here.
+
+class BlogApiTestData:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author@example.com', password='pass12345')
+        cls.reader = User.objects.create_user(username='reader', password='pass12345')
+        cls.blogs = [
+            Blog.objects.create(author=cls.author, title=f'Post {i} – ünïcode', content=f'Body {i}\n<b>x</b> ' * 40, status='published')
+            for i in range(5)
+        ]
+        # One uploaded image, the rest fall back to their default image
+        Blog.objects.filter(pk=cls.blogs[0].pk).update(image='images/ab/cd/abcdef.jpg')
+        Like.objects.create(blog=cls.blogs[1], user=cls.reader)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor links walk every row once in both directions; ?page= keeps the old shape."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='pager@example.com', password='pass12345')
+        Blog.objects.bulk_create(
+            Blog(author=cls.author, title=f'Post {i}', content='text', status='draft' if i == 3 else 'published')
+            for i in range(11)
+        )
+        # Equal timestamps: only the id tie-break keeps pages apart
+        Blog.objects.update(created_at=timezone.now())
+        cls.blog = Blog.objects.filter(status='published').first()
+        Comment.objects.bulk_create(Comment(blog=cls.blog, user=cls.author, content=f'c{i}') for i in range(7))
+
+    def walk(self, url, link='next'):
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                body = self.client.get(url).json()
+            # Keyset pages never OFFSET, however deep the walk goes
+            self.assertFalse([q for q in queries if 'OFFSET' in q['sql']])
+            pages.append([row['id'] for row in body['results']])
+            url = body[link]
+        return pages
+
+    def test_blog_cursor_walk_forwards_and_back(self):
+        forwards = self.walk('/api/blogs/?page_size=3&fields=id')
+        expected = list(Blog.objects.filter(status='published').order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(forwards, []), expected)
+        self.assertEqual(len(forwards), 4)
+        last_page = self.client.get('/api/blogs/?page_size=3&fields=id').json()
+        while last_page['next']:
+            last_page = self.client.get(last_page['next']).json()
+        backwards = self.walk(last_page['previous'], link='previous')
+        self.assertEqual(backwards, forwards[-2::-1])
+
+    def test_comment_cursor_walks_oldest_first(self):
+        pages = self.walk(f'/api/blogs/{self.blog.pk}/comments/?page_size=3')
+        expected = list(Comment.objects.filter(blog=self.blog).order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_legacy_page_numbers(self):
+        body = self.client.get('/api/blogs/?page=2&page_size=4&fields=id').json()
+        expected = list(Blog.objects.filter(status='published').order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(body['count'], 10)
+        self.assertEqual([row['id'] for row in body['results']], expected[4:8])
+        self.assertIn('page=3', body['next'])
+        self.assertEqual(self.client.get('/api/blogs/?page=9').status_code, 404)
+
+
+class FastBlogListSerializerTests(BlogApiTestData, TestCase):
+    """The values() fast path must render exactly what BlogSerializer renders."""
+
+    def render_both(self, user, fields=BLOG_FIELDS):
+        request = RequestFactory().get('/api/blogs/', HTTP_HOST='testserver')
+        request.user = user
+        queryset = Blog.objects.filter(status='published').select_related('author').order_by('-created_at', '-id')
+        slow = BlogSerializer(only_columns(queryset, fields), many=True, fields=fields, context={'request': request}).data
+        fast = FastBlogListSerializer(values_columns(queryset, fields), fields=fields, context={'request': request}).data
+        return JSONRenderer().render(slow), JSONRenderer().render(fast)
+
+    def test_output_is_byte_identical(self):
+        for user in (self.reader, self.author):
+            for fields in (BLOG_FIELDS, ('title', 'excerpt', 'liked_by_me'), ('image_srcset', 'created_at')):
+                slow, fast = self.render_both(user, fields)
+                self.assertEqual(slow, fast)
+        self.assertIn(b'"liked_by_me":true', self.render_both(self.reader)[1])
+
+    def test_list_endpoint_uses_fast_path(self):
+        response = self.client.get('/api/blogs/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(len(body['results']), 2)
+        # Cursor links still work on values() rows
+        rest = self.client.get(body['next']).json()
+        self.assertEqual(len(rest['results']), 2)
+        self.assertNotEqual(body['results'][0]['id'], rest['results'][0]['id'])
+
+
+class SparseFieldsTests(BlogApiTestData, TestCase):
+
+    def blog_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in queries if 'FROM "blogapp_blog"' in q['sql'] and 'MAX(' not in q['sql']]
+
+    def test_list_sends_excerpt_not_content(self):
+        response, sql = self.blog_queries('/api/blogs/')
+        result = response.json()['results'][0]
+        self.assertNotIn('content', result)
+        self.assertTrue(result['excerpt'].endswith('...'))
+        self.assertLessEqual(len(result['excerpt']), 153)
+        # The stored excerpt is read, never content
+        self.assertNotIn('"content"', sql[0])
+
+    def test_fields_limit_output_and_columns(self):
+        response, sql = self.blog_queries('/api/blogs/?fields=id,title')
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title'})
+        self.assertNotIn('content', sql[0])
+        self.assertNotIn('auth_user', sql[0])
+
+    def test_omit_and_detail(self):
+        response = self.client.get('/api/blogs/?omit=excerpt,image_srcset')
+        self.assertNotIn('excerpt', response.json()['results'][0])
+        self.assertNotIn('image_srcset', response.json()['results'][0])
+        blog = self.blogs[0]
+        detail = self.client.get(f'/api/blogs/{blog.pk}/').json()
+        self.assertEqual(detail['content'], blog.content)
+        self.assertNotIn('excerpt', detail)
+        response, sql = self.blog_queries(f'/api/blogs/{blog.pk}/?fields=title,author')
+        self.assertEqual(response.json(), {'title': blog.title, 'author': self.author.username})
+        self.assertNotIn('"content"', sql[0])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/blogs/?fields=title,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['fields'])
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username='jwt@example.com', password='pass12345')
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+
+    def test_user_row_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(self.token)
+        self.assertEqual((user.pk, user.username), (self.user.pk, 'jwt@example.com'))
+        self.assertEqual(user_cache.stats()['hit_ratio'], 0.5)
+
+    def test_save_invalidates(self):
+        self.auth.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+        self.assertEqual(user_cache.stats()['invalidations'], 1)
+
+    def test_api_requests_use_the_cache(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.client.get('/api/blogs/?fields=liked_by_me', **headers)
+        self.assertEqual(user_cache.stats()['misses'], 1)
+        self.client.get('/api/blogs/?fields=liked_by_me', **headers)
+        self.assertEqual(user_cache.stats()['hits'], 1)
+        self.assertEqual(self.client.get('/api/auth/user-cache/', **headers).status_code, 403)
+
+
+class ImageUploadApiTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='api-uploader', password='pass12345')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def create(self, data):
+        upload = SimpleUploadedFile('photo.png', data, content_type='image/png')
+        return self.client.post('/api/blogs/create/', {'title': 'Upload', 'content': 'text', 'author': self.user.pk, 'image': upload})
+
+    def test_create_stores_verified_image(self):
+        response = self.create(image_bytes((64, 64)))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Blog.objects.get().image.name.startswith('images/'))
+
+    def test_create_rejects_corrupt_image(self):
+        data = image_bytes((64, 64))
+        response = self.create(data[:40] + b'\0' * (len(data) - 40))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['image'], ['File is not a valid image.'])
+        self.assertFalse(Blog.objects.exists())
+
+    def test_patch_rejects_non_image(self):
+        blog = Blog.objects.create(author=self.user, title='Mine', content='text')
+        upload = SimpleUploadedFile('notes.txt', b'plain text', content_type='text/plain')
+        response = self.client.patch(
+            f'/api/blogs/{blog.pk}/', encode_multipart(BOUNDARY, {'image': upload}),
+            content_type=MULTIPART_CONTENT, **self.headers,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+
+
+class ConditionalRequestTests(TestCase):
+    """ETag / Last-Modified answer polls with 304 and stale writes with 412."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='etag@example.com', password='pass12345')
+        cls.blog = Blog.objects.create(author=cls.author, title='Tagged', content='text', status='published')
+        Comment.objects.create(blog=cls.blog, user=cls.author, content='First')
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.author)}'}
+        self.detail = f'/api/blogs/{self.blog.pk}/'
+
+    def patch(self, data, **headers):
+        return self.client.patch(
+            self.detail, encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT, **self.headers, **headers,
+        )
+
+    def test_matching_etag_is_not_modified(self):
+        for path in ('/api/blogs/', self.detail, f'/api/blogs/{self.blog.pk}/comments/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Last-Modified'])
+                with self.assertNumQueries(1):
+                    repeat = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.content, b'')
+                self.assertEqual(repeat['ETag'], response['ETag'])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.detail)
+        repeat = self.client.get(self.detail, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_counter_change_and_query_string_change_the_etag(self):
+        etag = self.client.get('/api/blogs/')['ETag']
+        self.assertNotEqual(self.client.get('/api/blogs/?fields=id')['ETag'], etag)
+        # like_count moves without touching updated_at
+        Like.objects.create(blog=self.blog, user=self.author)
+        response = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_counter_changes_that_cancel_out_change_the_etag(self):
+        other = Blog.objects.create(author=self.author, title='Other', content='text', status='published')
+        Like.objects.create(blog=other, user=self.author)
+        etag = self.client.get('/api/blogs/')['ETag']
+        # One like added here and one removed there leaves the totals as they were
+        Like.objects.create(blog=self.blog, user=self.author)
+        Like.objects.filter(blog=other).delete()
+        response = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_the_viewer_when_liked_by_me_is_shown(self):
+        Like.objects.create(blog=self.blog, user=self.author)
+        for path in ('/api/blogs/', self.detail):
+            with self.subTest(path=path):
+                anonymous = self.client.get(path)['ETag']
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=anonymous, **self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'"liked_by_me":true', response.content)
+                # Without liked_by_me everyone gets the same body and ETag
+                anonymous = self.client.get(path + '?fields=id,title')['ETag']
+                response = self.client.get(path + '?fields=id,title', HTTP_IF_NONE_MATCH=anonymous, **self.headers)
+                self.assertEqual(response.status_code, 304)
+
+    def test_missing_rows_have_no_validators(self):
+        response = self.client.get('/api/blogs/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_patch_with_stale_if_match_fails(self):
+        etag = self.client.get(self.detail, **self.headers)['ETag']
+        Comment.objects.create(blog=self.blog, user=self.author, content='Second')
+        response = self.patch({'title': 'Overwrite'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).title, 'Tagged')
+
+    def test_patch_with_current_if_match_succeeds(self):
+        etag = self.client.get(self.detail, **self.headers)['ETag']
+        response = self.patch({'title': 'Edited'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).title, 'Edited')
+        # The response carries the new validators for the next write
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.patch({'title': 'Again'}, HTTP_IF_MATCH=etag).status_code, 412)
+
+    def test_delete_honours_if_match(self):
+        self.assertEqual(self.client.delete(self.detail, HTTP_IF_MATCH='"stale"', **self.headers).status_code, 412)
+        self.assertTrue(Blog.objects.filter(pk=self.blog.pk).exists())
+        etag = self.client.get(self.detail, **self.headers)['ETag']
+        self.assertEqual(self.client.delete(self.detail, HTTP_IF_MATCH=etag, **self.headers).status_code, 204)
+        self.assertFalse(Blog.objects.filter(pk=self.blog.pk).exists())
+
+
+class SearchApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='api-search@example.com', password='pass12345')
+        for i in range(3):
+            Blog.objects.create(author=author, title=f'Kettle {i}', content='text', status='published')
+
+    def test_pages_link_to_each_other(self):
+        first = self.client.get('/api/blogs/search/', {'q': 'kettle', 'page_size': 2}).json()
+        self.assertEqual([row['title'] for row in first['results']], ['Kettle 2', 'Kettle 1'])
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['title'] for row in second['results']], ['Kettle 0'])
+        self.assertIsNone(second['next'])
+        self.assertNotIn('page=', second['previous'])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/api/blogs/search/').status_code, 400)
+
+    def test_out_of_range_page_is_not_found(self):
+        for page in (MAX_SEARCH_OFFSET + 2, 10 ** 30):
+            response = self.client.get('/api/blogs/search/', {'q': 'kettle', 'page': page, 'page_size': 1})
+            self.assertEqual(response.status_code, 404)
+
+
+class AsyncViewTests(BlogApiTestData, TestCase):
+    """GET/HEAD of the list and detail views run on the event loop and render JSON in place."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(3):
+            Comment.objects.create(blog=cls.blogs[0], user=cls.reader, content=f'Comment {i}')
+
+    def test_views_are_async(self):
+        for view in (BlogList, BlogDetail, CommentsList):
+            self.assertTrue(iscoroutinefunction(view.as_view()))
+
+    async def test_list(self):
+        response = await self.async_client.get('/api/blogs/')
+        self.assertEqual(response.status_code, 200)
+        # Rendered in place: Django gets a plain HttpResponse, not a DRF Response
+        self.assertNotIsInstance(response, Response)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        titles = [row['title'] for row in response.json()['results']]
+        self.assertEqual(titles, [blog.title for blog in reversed(self.blogs)])
+
+    async def test_detail(self):
+        blog = self.blogs[0]
+        response = await self.async_client.get(f'/api/blogs/{blog.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['id'], response.json()['author']), (blog.pk, 'author@example.com'))
+        self.assertEqual((await self.async_client.get('/api/blogs/999999/')).status_code, 404)
+
+    async def test_comments(self):
+        response = await self.async_client.get(f'/api/blogs/{self.blogs[0].pk}/comments/')
+        self.assertEqual([row['content'] for row in response.json()['results']], ['Comment 0', 'Comment 1', 'Comment 2'])
+
+    async def test_head(self):
+        response = await self.async_client.head('/api/blogs/')
+        self.assertEqual(response.status_code, 200)
+
+    async def test_liked_by_me_resolves_the_user_off_the_loop(self):
+        token = AccessToken.for_user(self.reader)
+        response = await self.async_client.get(f'/api/blogs/{self.blogs[1].pk}/?fields=id,liked_by_me', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.json(), {'id': self.blogs[1].pk, 'liked_by_me': True})
+        anonymous = await self.async_client.get(f'/api/blogs/{self.blogs[1].pk}/?fields=id,liked_by_me')
+        self.assertEqual(anonymous.json(), {'id': self.blogs[1].pk, 'liked_by_me': False})
+
+    async def test_browsable_api_still_renders(self):
+        response = await self.async_client.get('/api/blogs/', headers={'Accept': 'text/html'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+    def test_writes_use_sync_dispatch(self):
+        blog = self.blogs[0]
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.author)}'}
+        response = self.client.patch(f'/api/blogs/{blog.pk}/', encode_multipart(BOUNDARY, {'title': 'Patched'}), content_type=MULTIPART_CONTENT, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Patched')
+
+
+class BulkEndpointTests(TestCase):
+    """Bulk create / publish / draft / delete report a result per item, in request order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bulk@example.com', password='pass12345')
+        cls.other = User.objects.create_user(username='other@example.com', password='pass12345')
+        cls.mine = [Blog.objects.create(author=cls.user, title=f'Mine {i}', content='text') for i in range(3)]
+        cls.theirs = Blog.objects.create(author=cls.other, title='Theirs', content='text')
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def post(self, action, data):
+        return self.client.post(f'/api/blogs/bulk/{action}/', data, content_type='application/json', **self.headers)
+
+    def create(self):
+        response = self.post('create', {'blogs': [
+            {'title': 'Bulk one', 'content': 'searchable words here', 'status': 'published'},
+            {'title': ''},
+            {'title': 'As someone else', 'content': 'text', 'author': self.other.pk},
+            {'title': 'Bulk two', 'content': 'more text'},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['results']
+
+    def check_created(self, results):
+        self.assertEqual([result['ok'] for result in results], [True, False, False, True])
+        self.assertIn('title', results[1]['errors'])
+        self.assertEqual(results[2]['error'], 'You may only create blogs as yourself')
+        for result in (results[0], results[3]):
+            blog = Blog.objects.get(pk=result['id'])
+            self.assertEqual((blog.author_id, blog.title), (self.user.pk, result['blog']['title']))
+            self.assertEqual(blog.word_count, len(blog.content.split()))
+        self.assertEqual([blog.pk for blog in SearchResults('searchable', Blog.objects.all())[0:10]], [results[0]['id']])
+
+    def test_create(self):
+        self.check_created(self.create())
+
+    def test_create_without_returned_ids(self):
+        # Plain MySQL: bulk_create() can't hand back the new ids
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', False):
+            self.check_created(self.create())
+
+    def test_publish_and_draft(self):
+        ids = [self.mine[0].pk, self.theirs.pk, 999999, self.mine[1].pk, self.mine[0].pk]
+        Blog.objects.filter(pk=self.mine[1].pk).update(status='published')
+        results = self.post('publish', {'ids': ids}).json()['results']
+        self.assertEqual(results, [
+            {'id': self.mine[0].pk, 'ok': True, 'changed': True},
+            {'id': self.theirs.pk, 'ok': False, 'error': 'You do not have permission to change this blog'},
+            {'id': 999999, 'ok': False, 'error': 'Not found'},
+            {'id': self.mine[1].pk, 'ok': True, 'changed': False},
+        ])
+        self.assertEqual(Blog.objects.get(pk=self.mine[0].pk).status, 'published')
+        self.assertEqual(Blog.objects.get(pk=self.theirs.pk).status, 'draft')
+        results = self.post('draft', {'ids': [self.mine[0].pk]}).json()['results']
+        self.assertEqual(results, [{'id': self.mine[0].pk, 'ok': True, 'changed': True}])
+        self.assertEqual(Blog.objects.get(pk=self.mine[0].pk).status, 'draft')
+
+    def test_delete(self):
+        Like.objects.create(blog=self.mine[0], user=self.other)
+        results = self.post('delete', {'ids': [self.mine[0].pk, self.theirs.pk, self.mine[2].pk]}).json()['results']
+        self.assertEqual([result['ok'] for result in results], [True, False, True])
+        self.assertEqual(list(Blog.objects.order_by('pk').values_list('title', flat=True)), ['Mine 1', 'Theirs'])
+        self.assertFalse(Like.objects.exists())
+
+    def test_requires_authentication_and_ids(self):
+        self.headers = {}
+        self.assertEqual(self.post('publish', {'ids': [self.mine[0].pk]}).status_code, 401)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.assertEqual(self.post('delete', {'ids': []}).status_code, 400)
+
+
+class LikedByMeTests(BlogApiTestData, TestCase):
+    """liked_by_me for a whole page costs one query on the likes table."""
+
+    def like_queries(self, path):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.reader)}'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, 200)
+        table = Like._meta.db_table
+        return response.json()['results'], [q['sql'] for q in queries if table in q['sql']]
+
+    def test_list(self):
+        rows, queries = self.like_queries('/api/blogs/?fields=id,liked_by_me')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual({row['id'] for row in rows if row['liked_by_me']}, {self.blogs[1].pk})
+
+    def test_search(self):
+        rows, queries = self.like_queries('/api/blogs/search/?q=post&fields=id,liked_by_me')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row['id'] for row in rows if row['liked_by_me']}, {self.blogs[1].pk})
+
+    def test_not_requested_means_no_query(self):
+        _, queries = self.like_queries('/api/blogs/?fields=id,title')
+        self.assertEqual(queries, [])
+
+    def test_serializer_batches_without_a_prepared_context(self):
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        with CaptureQueriesContext(connection) as queries:
+            data = BlogSerializer(Blog.objects.select_related('author'), many=True, context={'request': request}).data
+        self.assertEqual(len([q for q in queries if Like._meta.db_table in q['sql']]), 1)
+        self.assertEqual([row['id'] for row in data if row['liked_by_me']], [self.blogs[1].pk])
@@ -10,13 +10,20 @@ urlpatterns = [
     # auth
     path('auth/register/', views.Registeruser.as_view(), name='api-register'),
     path('auth/login/', views.LoginUser.as_view(), name='api-login'),
+    path('auth/user-cache/', views.UserCacheStats.as_view(), name='api-user-cache-stats'),
 
     # blogs
     path('blogs/', views.BlogList.as_view(), name='api-blogs-list'),
+    path('blogs/search/', views.BlogSearch.as_view(), name='api-blogs-search'),
     path('blogs/<int:id>/', views.BlogDetail.as_view(), name='api-blog-detail'),
     path('blogs/<int:id>/publish/', views.BlogPublish.as_view(), name='api-blog-publish'),
     path('blogs/<int:id>/draft/', views.BlogSaveDraft.as_view(), name='api-blog-draft'),
+    path('blogs/<int:id>/like/', views.BlogLike.as_view(), name='api-blog-like'),
     path('blogs/create/', views.BlogCreate.as_view(), name='api-blog-create'),
+    path('blogs/bulk/create/', views.BlogBulkCreate.as_view(), name='api-blogs-bulk-create'),
+    path('blogs/bulk/publish/', views.BlogBulkPublish.as_view(), name='api-blogs-bulk-publish'),
+    path('blogs/bulk/draft/', views.BlogBulkDraft.as_view(), name='api-blogs-bulk-draft'),
+    path('blogs/bulk/delete/', views.BlogBulkDelete.as_view(), name='api-blogs-bulk-delete'),
 
     # comments
     path('blogs/<int:id>/comments/', views.CommentsList.as_view(), name='api-comments-list'),
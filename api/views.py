@@ -6,41 +6,57 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, CreateAPIView, RetrieveUpdateDestroyAPIView, GenericAPIView
 from rest_framework.exceptions import MethodNotAllowed
-from drf_spectacular.utils import extend_schema
-from rest_framework.permissions import BasePermission, SAFE_METHODS
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework.permissions import BasePermission, IsAdminUser, IsAuthenticated, SAFE_METHODS
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from .serializers import (
     RegisterSerializer,
     RegisterResponseSerializer,
     LoginSerializer,
     LoginResponseSerializer,
     BlogSerializer,
+    FastBlogListSerializer,
+    BLOG_FIELDS,
     BlogCreateSerializer,
+    BulkIdsSerializer,
+    BulkBlogItemSerializer,
+    BulkCreateSerializer,
+    BulkResponseSerializer,
+    LikeStateSerializer,
+    UserCacheStatsSerializer,
 )
 from blogapp.models import Blog
+from blogapp.search import SearchResults
+from blogapp.database_logic import aliked_blog_ids, create_blogs, set_blogs_status
+from django.utils.cache import patch_vary_headers
+from blogapp.business_logic import set_like
+from django.http import Http404
+from django.db import transaction
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 from .serializers import CommentSerializer
+from .pagination import KeysetPagination, CommentKeysetPagination, SearchPagination
+from .authentication import CachedJWTAuthentication, user_cache
+from .conditional import ConditionalMixin
+from .async_views import AsyncListMixin, AsyncRetrieveMixin
+from .sparse import SPARSE_PARAMETERS, SparseFieldsMixin, only_columns, values_columns
 from blogapp.models import Comment as BlogComment
+from authentication.throttling import EmailRateThrottle, IPRateThrottle
+from utils.uploads import ImageUploadMixin
 
 class Registeruser(APIView):
     """Register a new user."""
+    throttle_scope = 'register'
+    throttle_classes = [IPRateThrottle]
 
     # Request should only ask for email + password; response contains only a message and a minimal user object
-    @extend_schema(request=RegisterSerializer, responses={201: RegisterResponseSerializer})
+    @extend_schema(request=RegisterSerializer, responses={201: RegisterResponseSerializer, 429: None})
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        # Only email and password are required per new schema
-        email = serializer.validated_data.get('email')
-        password = serializer.validated_data.get('password')
-
-        # Ensure uniqueness
-        if User.objects.filter(email=email).exists() or User.objects.filter(username=email).exists():
-            return Response({'error': 'A user with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
-        user = User.objects.create_user(username=email, email=email, password=password)
+        # username and normalized email are unique in the database; a duplicate
+        # (even one racing this request) comes back as a ValidationError
+        user = serializer.save()
 
         return Response({
             'message': 'User registered successfully',
@@ -59,14 +75,18 @@ class IsAuthorOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         # For unsafe methods require authentication and that the user is author or staff
-        return bool(request.user and request.user.is_authenticated and (obj.author == request.user or request.user.is_staff))
+        # Compare ids so a blog loaded with only('id', 'author_id') needs no extra query
+        return bool(request.user and request.user.is_authenticated and (obj.author_id == request.user.pk or request.user.is_staff))
 
 
 class LoginUser(APIView):
     """Authenticate an existing user (email + password)."""
+    # Checked in initial(), before the password is hashed
+    throttle_scope = 'login'
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
 
     # Request should only ask for email + password; response returns user info and JWT token
-    @extend_schema(request=LoginSerializer, responses={200: LoginResponseSerializer, 401: None})
+    @extend_schema(request=LoginSerializer, responses={200: LoginResponseSerializer, 401: None, 429: None})
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -74,13 +94,8 @@ class LoginUser(APIView):
         email = serializer.validated_data.get('email')
         password = serializer.validated_data.get('password')
 
-        # Find user by email and authenticate using username
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response({'error': 'Invalid email or password'}, status=status.HTTP_401_UNAUTHORIZED)
-
-        user = authenticate(username=user_obj.username, password=password)
+        # One indexed lookup by normalized email (authentication.backends.EmailBackend)
+        user = authenticate(request, email=email, password=password)
 
         if user is None:
             return Response({'error': 'Invalid email or password'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -100,17 +115,103 @@ class LoginUser(APIView):
         })
 
 
-class BlogList(ListAPIView):
+class UserCacheStats(APIView):
+    """Hit ratio of the JWT user cache in the worker that serves the request (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=UserCacheStatsSerializer)
+    def get(self, request):
+        return Response(user_cache.stats())
+
+
+class LikedByMeMixin:
+    """Prepare BlogSerializer.liked_by_me for every blog on the page with one async query."""
+
+    async def aget_extra_context(self, rows):
+        context = await super().aget_extra_context(rows)
+        if 'liked_by_me' not in self.get_requested_fields():
+            return context
+        user = await self.aresolve_user(self.request)
+        ids = [row['id'] if isinstance(row, dict) else row.pk for row in rows]
+        context['liked_ids'] = await aliked_blog_ids(user, ids)
+        return context
+
+    async def aget_validators(self, request):
+        if 'liked_by_me' in self.get_requested_fields():
+            self.viewer_id = (await self.aresolve_user(request)).pk
+        return await super().aget_validators(request)
+
+    def get_validators(self, request):
+        # Sync path of conditional_write(); DRF has authenticated by now
+        if 'liked_by_me' in self.get_requested_fields():
+            self.viewer_id = request.user.pk
+        return super().get_validators(request)
+
+    def make_validators(self, request, values):
+        # One viewer's ETag must not answer another's poll with a 304
+        if hasattr(self, 'viewer_id'):
+            values = {**values, 'viewer': self.viewer_id}
+        return super().make_validators(request, values)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # The body depends on who is asking
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+# List responses carry an excerpt instead of the full body unless asked for it
+LIST_DEFAULT_FIELDS = tuple(name for name in BLOG_FIELDS if name != 'content')
+DETAIL_DEFAULT_FIELDS = tuple(name for name in BLOG_FIELDS if name != 'excerpt')
+
+
+class BlogList(SparseFieldsMixin, LikedByMeMixin, ConditionalMixin, AsyncListMixin, ListAPIView):
     """List all published blogs."""
-    queryset = Blog.objects.filter(status='published').order_by('-created_at')
+    queryset = Blog.objects.filter(status='published').select_related('author').order_by('-created_at', '-id')
     serializer_class = BlogSerializer
+    pagination_class = KeysetPagination
+    validator_fields = ('updated_at', 'counters_changed_at')
+    default_fields = LIST_DEFAULT_FIELDS
 
-    @extend_schema(responses=BlogSerializer(many=True))
+    def get_list_queryset(self):
+        # Pages are built from a values() projection by FastBlogListSerializer
+        return values_columns(super().get_list_queryset(), self.get_requested_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many'):
+            return FastBlogListSerializer(args[0], context=self.get_serializer_context(), fields=self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(parameters=SPARSE_PARAMETERS, responses=BlogSerializer(many=True))
+    async def get(self, request, *args, **kwargs):
+        return await super().get(request, *args, **kwargs)
+
+
+class BlogSearch(SparseFieldsMixin, GenericAPIView):
+    """Full-text search over published blogs, best matches first."""
+    queryset = Blog.objects.filter(status='published').select_related('author')
+    serializer_class = BlogSerializer
+    pagination_class = SearchPagination
+    default_fields = LIST_DEFAULT_FIELDS
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', str, required=True, description='Words to search for in titles and content.'),
+            *SPARSE_PARAMETERS,
+        ],
+        responses=BlogSerializer(many=True),
+    )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = only_columns(self.get_queryset(), self.get_requested_fields())
+        page = self.paginate_queryset(SearchResults(query, queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class BlogCreate(CreateAPIView):
+class BlogCreate(ImageUploadMixin, CreateAPIView):
     """Create a new blog post."""
     parser_classes = [MultiPartParser, FormParser]
     queryset = Blog.objects.all()
@@ -121,13 +222,19 @@ class BlogCreate(CreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class BlogDetail(RetrieveUpdateDestroyAPIView):
+class BlogDetail(ImageUploadMixin, SparseFieldsMixin, LikedByMeMixin, ConditionalMixin, AsyncRetrieveMixin, RetrieveUpdateDestroyAPIView):
     """Retrieve, update (PATCH) or delete a single blog by id."""
-    queryset = Blog.objects.all()
+    # Author joined so the async GET never lazy-loads it
+    queryset = Blog.objects.select_related('author')
     lookup_field = 'id'
+    validator_fields = ('updated_at', 'counters_changed_at')
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [IsAuthorOrReadOnly]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+    default_fields = DETAIL_DEFAULT_FIELDS
+
+    def get_retrieve_queryset(self):
+        return only_columns(super().get_retrieve_queryset(), self.get_requested_fields())
 
     def get_serializer_class(self):
         # Use BlogSerializer for reads and BlogUpdateSerializer for updates
@@ -136,24 +243,25 @@ class BlogDetail(RetrieveUpdateDestroyAPIView):
             return BlogUpdateSerializer
         return BlogSerializer
 
-    @extend_schema(responses=BlogSerializer)
-    def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+    @extend_schema(parameters=SPARSE_PARAMETERS, responses=BlogSerializer)
+    async def get(self, request, *args, **kwargs):
+        return await super().get(request, *args, **kwargs)
 
     @extend_schema(exclude=True)
     def put(self, request, *args, **kwargs):
         # Keep PUT behavior identical to PATCH but exclude it from the OpenAPI schema.
-        return super().put(request, *args, **kwargs)
+        return self.conditional_write(super().put, request, *args, **kwargs)
 
     @extend_schema(request=__import__('api.serializers', fromlist=['BlogUpdateSerializer']).BlogUpdateSerializer,
                    responses=BlogSerializer)
     def patch(self, request, *args, **kwargs):
-        return super().patch(request, *args, **kwargs)
+        # If-Match makes concurrent edits fail with 412 instead of overwriting
+        return self.conditional_write(super().patch, request, *args, **kwargs)
 
     @extend_schema(responses={204: None})
     def delete(self, request, *args, **kwargs):
         """Delete the blog instance. Returns 204 No Content on success."""
-        return super().delete(request, *args, **kwargs)
+        return self.conditional_write(super().delete, request, *args, **kwargs)
 
 
 class BlogSaveDraft(GenericAPIView):
@@ -187,17 +295,168 @@ class BlogPublish(GenericAPIView):
         return Response(serializer.data)
 
 
-class CommentsList(ListAPIView):
+class BlogLike(APIView):
+    """Like (PUT) or unlike (DELETE) a blog. Both are idempotent."""
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def set_like(self, request, id, liked):
+        try:
+            like_count = set_like(id, request.user.pk, liked)
+        except Blog.DoesNotExist:
+            raise Http404
+        return Response({'liked': liked, 'like_count': like_count})
+
+    @extend_schema(request=None, responses=LikeStateSerializer)
+    def put(self, request, id, *args, **kwargs):
+        return self.set_like(request, id, True)
+
+    @extend_schema(request=None, responses=LikeStateSerializer)
+    def delete(self, request, id, *args, **kwargs):
+        return self.set_like(request, id, False)
+
+
+class BulkBlogView(GenericAPIView):
+    """Shared plumbing for the bulk endpoints: JWT auth and one-query permission checks."""
+    queryset = Blog.objects.all()
+    serializer_class = BulkIdsSerializer
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    # Rows per DELETE statement in bulk deletes
+    delete_chunk_size = 100
+
+    def check_blogs(self, request, ids):
+        """
+        Load every requested blog in one query and check IsAuthorOrReadOnly
+        on each. Returns (blogs the user may change keyed by id, per-id errors).
+        """
+        blogs = Blog.objects.only('id', 'author_id', 'status').in_bulk(ids)
+        permission = IsAuthorOrReadOnly()
+        errors = {}
+        for blog_id in ids:
+            blog = blogs.get(blog_id)
+            if blog is None:
+                errors[blog_id] = 'Not found'
+            elif not permission.has_object_permission(request, self, blog):
+                errors[blog_id] = 'You do not have permission to change this blog'
+                del blogs[blog_id]
+        return blogs, errors
+
+    def get_ids(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Keep request order, drop repeats
+        return list(dict.fromkeys(serializer.validated_data['ids']))
+
+
+class BulkStatusView(BulkBlogView):
+    """Set the status of many blogs with one UPDATE ... WHERE id IN."""
+    target_status = None
+
+    @extend_schema(request=BulkIdsSerializer, responses=BulkResponseSerializer)
+    def post(self, request, *args, **kwargs):
+        ids = self.get_ids(request)
+        blogs, errors = self.check_blogs(request, ids)
+        to_change = [pk for pk, blog in blogs.items() if blog.status != self.target_status]
+        with transaction.atomic():
+            set_blogs_status(to_change, self.target_status)
+        results = []
+        for blog_id in ids:
+            if blog_id in errors:
+                results.append({'id': blog_id, 'ok': False, 'error': errors[blog_id]})
+            else:
+                results.append({'id': blog_id, 'ok': True, 'changed': blog_id in to_change})
+        return Response({'results': results})
+
+
+class BlogBulkPublish(BulkStatusView):
+    """Publish many blogs at once (status='published')."""
+    target_status = 'published'
+
+
+class BlogBulkDraft(BulkStatusView):
+    """Move many blogs back to draft (status='draft')."""
+    target_status = 'draft'
+
+
+class BlogBulkDelete(BulkBlogView):
+    """Delete many blogs in one transaction, a chunk of rows per statement."""
+
+    @extend_schema(request=BulkIdsSerializer, responses=BulkResponseSerializer)
+    def post(self, request, *args, **kwargs):
+        ids = self.get_ids(request)
+        blogs, errors = self.check_blogs(request, ids)
+        to_delete = list(blogs)
+        with transaction.atomic():
+            for start in range(0, len(to_delete), self.delete_chunk_size):
+                # Collector deletes: Blog signals still release images and update caches/search
+                Blog.objects.filter(pk__in=to_delete[start:start + self.delete_chunk_size]).delete()
+        results = []
+        for blog_id in ids:
+            if blog_id in errors:
+                results.append({'id': blog_id, 'ok': False, 'error': errors[blog_id]})
+            else:
+                results.append({'id': blog_id, 'ok': True})
+        return Response({'results': results})
+
+
+class BlogBulkCreate(BulkBlogView):
+    """Create many blogs in one transaction (see create_blogs). Items default to the requesting user as author."""
+    serializer_class = BulkCreateSerializer
+
+    @extend_schema(request=BulkCreateSerializer, responses=BulkResponseSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = BulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [BulkBlogItemSerializer(data=data) for data in serializer.validated_data['blogs']]
+        valid = [item.is_valid() for item in items]
+
+        # Authors checked the way IsAuthorOrReadOnly would: yourself, or anyone for staff
+        author_ids = {request.user.pk}
+        author_ids.update(item.validated_data.get('author', request.user.pk) for item, ok in zip(items, valid) if ok)
+        authors = User.objects.in_bulk(author_ids)
+        results, new_blogs = [], []
+        for item, ok in zip(items, valid):
+            if not ok:
+                results.append({'id': None, 'ok': False, 'errors': item.errors})
+                continue
+            fields = dict(item.validated_data)
+            author_id = fields.pop('author', request.user.pk)
+            if author_id not in authors:
+                results.append({'id': None, 'ok': False, 'errors': {'author': ['Author (user id) does not exist']}})
+            elif author_id != request.user.pk and not request.user.is_staff:
+                results.append({'id': None, 'ok': False, 'error': 'You may only create blogs as yourself'})
+            else:
+                blog = Blog(author=authors[author_id], **fields)
+                # bulk_create() skips save(), which fills these in
+                blog.update_summary()
+                new_blogs.append(blog)
+                results.append(blog)
+
+        with transaction.atomic():
+            create_blogs(new_blogs)
+
+        for index, result in enumerate(results):
+            if isinstance(result, Blog):
+                # Brand new, so nobody has liked it yet
+                data = BlogSerializer(result, context={'request': request, 'liked_ids': set()}).data
+                results[index] = {'id': result.pk, 'ok': True, 'blog': data}
+        return Response({'results': results}, status=status.HTTP_201_CREATED if new_blogs else status.HTTP_200_OK)
+
+
+class CommentsList(ConditionalMixin, AsyncListMixin, ListAPIView):
     """List comments for a given blog (by blog id path param)."""
     serializer_class = CommentSerializer
+    pagination_class = CommentKeysetPagination
 
     def get_queryset(self):
         blog_id = self.kwargs.get('id')
-        return BlogComment.objects.filter(blog_id=blog_id).order_by('created_at')
+        return BlogComment.objects.filter(blog_id=blog_id).select_related('user').order_by('created_at', 'id')
 
     @extend_schema(responses=CommentSerializer(many=True))
-    def get(self, request, id, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+    async def get(self, request, id, *args, **kwargs):
+        return await super().get(request, *args, **kwargs)
 
 
 # @api_view(['POST'])
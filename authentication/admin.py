@@ -1,3 +1,28 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.forms import UserChangeForm
+from django.contrib.auth.models import User
+from .backends import normalize_email
 
-# Register your models here.
+
+class UniqueEmailUserChangeForm(UserChangeForm):
+    """
+    The unique email index (migration 0003) lives outside the model
+    state, so the admin can't validate it by itself; without this check a
+    duplicate would surface as an IntegrityError.
+    """
+
+    def clean_email(self):
+        email = normalize_email(self.cleaned_data.get('email'))
+        if email and User.objects.filter(email=email).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError('Another account already uses this email address.')
+        return email
+
+
+class EmailUserAdmin(UserAdmin):
+    form = UniqueEmailUserChangeForm
+
+
+admin.site.unregister(User)
+admin.site.register(User, EmailUserAdmin)
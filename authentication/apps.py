@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        # Connects the receiver that normalizes User.email on save and
+        # registers the shared-cache deploy checks
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+def normalize_email(email):
+    """
+    The form every email is stored and looked up in (trimmed, lower case).
+    Migration 0003 normalized existing rows and made non-empty emails
+    unique regardless of case; authentication.signals applies it on save.
+    """
+    return (email or '').strip().lower()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Log in with email + password in a single indexed query.
+
+    Accepts `email=` or, for callers such as the admin login, an email passed
+    as `username=`. Anything without an '@' is left to ModelBackend, which
+    comes next in AUTHENTICATION_BACKENDS.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = normalize_email(email or username)
+        if '@' not in email or password is None:
+            return None
+        UserModel = get_user_model()
+        user = UserModel._default_manager.filter(email=email).first()
+        if user is None:
+            # Run the hasher anyway so a missing account takes as long as a wrong password
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
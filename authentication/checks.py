@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries are private to one process (or not kept at all)
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def per_process_cache():
+    """The default cache backend's path when workers can't share it, else None."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    return backend if backend in PER_PROCESS_CACHES else None
+
+
+@register(Tags.caches, deploy=True)
+def check_throttle_cache(app_configs, **kwargs):
+    # authentication/throttling.py counts in the default cache
+    backend = per_process_cache()
+    if backend is None:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is not shared between processes: every worker "
+        "keeps its own login / registration / password-reset rate limit counters.",
+        hint="Point CACHES['default'] at Redis or Memcached (CACHE_BACKEND / CACHE_LOCATION).",
+        id='authentication.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_otp_cache(app_configs, **kwargs):
+    # authentication/otp.py keeps reset codes in the default cache
+    backend = per_process_cache()
+    if backend is None:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is not shared between processes: a password-reset "
+        "code issued by one worker can't be verified by another.",
+        hint="Point CACHES['default'] at Redis or Memcached (CACHE_BACKEND / CACHE_LOCATION).",
+        id='authentication.W002',
+    )]
@@ -0,0 +1,16 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from blogproject.session_backend import PURGE_BATCH_SIZE, purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches (safe to run from cron on a busy database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(Session, batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)."))
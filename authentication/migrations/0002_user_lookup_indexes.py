@@ -0,0 +1,38 @@
+# Generated by hand: indexes on django.contrib.auth's User for the login and
+# password-reset lookups. auth_user belongs to another app, so the indexes are
+# created through the schema editor instead of AddIndex.
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+USER_INDEXES = [
+    # Login: WHERE email = ?
+    models.Index(fields=['email'], name='auth_user_email_idx'),
+    # Forgot password: WHERE LOWER(email) = ? OR LOWER(username) = ?
+    models.Index(Lower('email'), name='auth_user_email_lower_idx'),
+    models.Index(Lower('username'), name='auth_user_username_lower_idx'),
+]
+
+
+def add_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.add_index(User, index)
+
+
+def remove_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_user_indexes, remove_user_indexes),
+    ]
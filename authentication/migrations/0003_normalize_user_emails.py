@@ -0,0 +1,65 @@
+# Generated by hand: store every auth_user email trimmed and lower-cased and
+# make non-empty emails unique, so EmailBackend can log in with one exact
+# lookup and registration can rely on the database instead of exists()
+# checks. The index is on the lower-cased address, so it also holds for emails
+# saved around authentication/signals.py (raw SQL, update()). Accounts created
+# without an email keep '' and are not constrained.
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Lower, NullIf
+
+
+EMAIL_UNIQUE = models.UniqueConstraint(Lower(NullIf(F('email'), Value(''))), name='auth_user_email_ci_uniq')
+
+
+def normalize_emails(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    owners = defaultdict(list)
+    for pk, email in User.objects.values_list('id', 'email').order_by('id').iterator(chunk_size=2000):
+        email = (email or '').strip().lower()
+        if email:
+            owners[email].append(pk)
+    duplicates = {email: ids for email, ids in owners.items() if len(ids) > 1}
+    if duplicates:
+        # Users log in by email, so which account keeps a shared address is
+        # for an admin to decide; nothing is changed until then
+        report = '\n'.join(
+            f"  {email}: user ids {', '.join(map(str, ids))}" for email, ids in sorted(duplicates.items())
+        )
+        raise RuntimeError(
+            'Cannot make user emails unique, these addresses belong to more than one account:\n'
+            f'{report}\nChange or clear the extra addresses (e.g. in the admin), then run migrate again.'
+        )
+
+    changed = []
+    for user in User.objects.only('id', 'email').iterator(chunk_size=2000):
+        email = (user.email or '').strip().lower()
+        if email != user.email:
+            user.email = email
+            changed.append(user)
+    User.objects.bulk_update(changed, ['email'], batch_size=500)
+
+
+def add_email_unique(apps, schema_editor):
+    # Expression indexes: SQLite, PostgreSQL, MySQL 8.0.13+
+    if schema_editor.connection.features.supports_expression_indexes:
+        schema_editor.add_constraint(apps.get_model('auth', 'User'), EMAIL_UNIQUE)
+
+
+def remove_email_unique(apps, schema_editor):
+    if schema_editor.connection.features.supports_expression_indexes:
+        schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_UNIQUE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_lookup_indexes'),
+    ]
+
+    operations = [
+        # Normalizing is lossless for login (lookups are case-insensitive), so there is nothing to undo
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.RunPython(add_email_unique, remove_email_unique),
+    ]
@@ -0,0 +1,103 @@
+"""
+One-time codes for the password-reset flow, kept in the default cache.
+
+Per email the cache holds the HMAC of the current code and a failed-attempt
+counter, both expiring after OTP_TTL, and after a successful verify() a
+"verified" marker that reset_password consumes exactly once. Entries
+expire natively, so there is nothing to clean up, and no step writes the
+session table (views carry the email in a signed cookie).
+
+Like the page cache and throttling counters this needs a cache shared by
+every worker (Redis / Memcached in production, see CACHES); with a
+per-process cache a code issued by one worker is unknown to the others.
+`manage.py check --deploy` reports that (authentication.checks).
+"""
+import hashlib
+import secrets
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# Seconds a code stays valid
+OTP_TTL = getattr(settings, 'PASSWORD_RESET_OTP_TTL', 600)
+
+# Wrong codes allowed before the code is burned and a new one is needed
+OTP_MAX_ATTEMPTS = getattr(settings, 'PASSWORD_RESET_OTP_ATTEMPTS', 5)
+
+# Seconds between a verified code and the new password being set
+RESET_TTL = getattr(settings, 'PASSWORD_RESET_WINDOW', 600)
+
+KEY_PREFIX = 'otp'
+
+# verify() results
+VERIFIED = 'verified'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+LOCKED = 'locked'
+
+
+def _keys(email):
+    digest = hashlib.md5(email.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:code:{digest}', f'{KEY_PREFIX}:attempts:{digest}', f'{KEY_PREFIX}:verified:{digest}'
+
+
+def _code_hash(email, code):
+    return salted_hmac('authentication.otp', f'{email}:{code}').hexdigest()
+
+
+def issue(email):
+    """
+    Start (or restart) a reset for `email` and return the new 4-digit code.
+    A resend replaces the code but keeps a failed-attempt count that has
+    guesses left, so resending doesn't top them up; the count lives as long
+    as the newest code. Once the guesses are used up the new code starts
+    from zero, otherwise nobody could ever unlock the account; how often
+    that can happen is capped by the 'otp' throttle on the sending views.
+    """
+    code = str(1000 + secrets.randbelow(9000))
+    code_key, attempts_key, verified_key = _keys(email)
+    if not cache.add(attempts_key, 0, timeout=OTP_TTL):
+        if cache.get(attempts_key, 0) >= OTP_MAX_ATTEMPTS:
+            cache.set(attempts_key, 0, timeout=OTP_TTL)
+        else:
+            cache.touch(attempts_key, OTP_TTL)
+    cache.set(code_key, _code_hash(email, code), timeout=OTP_TTL)
+    cache.delete(verified_key)
+    return code
+
+
+def verify(email, code):
+    """
+    Check `code` against the issued one. Every call counts as an attempt;
+    past OTP_MAX_ATTEMPTS the code is deleted. On success the code is used
+    up and `email` may reset its password (see consume()).
+    """
+    code_key, attempts_key, verified_key = _keys(email)
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        # Never issued, or expired
+        return EXPIRED
+    if attempts > OTP_MAX_ATTEMPTS:
+        cache.delete(code_key)
+        return LOCKED
+    stored = cache.get(code_key)
+    if stored is None:
+        return EXPIRED
+    if not constant_time_compare(stored, _code_hash(email, code)):
+        return INVALID
+    # delete() is atomic: only one of two racing correct guesses gets through
+    if not cache.delete(code_key):
+        return EXPIRED
+    cache.delete(attempts_key)
+    cache.set(verified_key, 1, timeout=RESET_TTL)
+    return VERIFIED
+
+
+def is_verified(email):
+    return cache.get(_keys(email)[2]) is not None
+
+
+def consume(email):
+    """Use up a verified reset. True for exactly one caller."""
+    return bool(cache.delete(_keys(email)[2]))
@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from .backends import normalize_email
+
+
+@receiver(pre_save, sender=User)
+def normalize_user_email(sender, instance, **kwargs):
+    # Registration normalizes already; this covers the admin, createsuperuser
+    # and the shell, so EmailBackend's exact lookup finds every account
+    instance.email = normalize_email(instance.email)
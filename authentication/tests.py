@@ -1,3 +1,263 @@
-from django.test import TestCase
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+from django.apps import apps as django_apps
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from blogapp.models import OutboxEmail
+from blogproject.session_backend import SessionStore
+from . import otp
+from .checks import check_otp_cache, check_throttle_cache
+from .throttling import hit
 
-# Create your tests here.
+
+class SessionStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        store = SessionStore()
+        store['cart'] = [1, 2]
+        store.create()
+        self.session_key = store.session_key
+
+    def through_middleware(self, view):
+        # The request/response cycle SessionMiddleware runs for every view
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.session_key
+        return SessionMiddleware(view)(request)
+
+    def session_queries(self, view):
+        with CaptureQueriesContext(connection) as queries:
+            self.through_middleware(view)
+        return [q['sql'] for q in queries if Session._meta.db_table in q['sql']]
+
+    def test_engine_is_installed(self):
+        self.assertIsInstance(self.client.session, SessionStore)
+
+    def test_unchanged_save_is_skipped(self):
+        def view(request):
+            request.session['cart'] = [1, 2]
+            return HttpResponse()
+        self.assertEqual(self.session_queries(view), [])
+
+    def test_changed_save_writes_through(self):
+        def view(request):
+            request.session['cart'] = [1, 2, 3]
+            return HttpResponse()
+        self.assertEqual(len(self.session_queries(view)), 1)
+        cache.clear()
+        self.assertEqual(SessionStore(self.session_key)['cart'], [1, 2, 3])
+
+    def test_reads_come_from_the_cache(self):
+        def view(request):
+            return HttpResponse(str(request.session['cart']))
+        self.assertEqual(self.session_queries(view), [])
+        cache.clear()
+        # Cache miss: one read from the table, which refills the cache
+        self.assertEqual(len(self.session_queries(view)), 1)
+        self.assertEqual(self.session_queries(view), [])
+
+    def test_logged_in_requests_write_no_session_row(self):
+        user = User.objects.create_user(username='session@example.com', password='pass12345')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/my/').status_code, 200)
+        writes = [q['sql'] for q in queries if Session._meta.db_table in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+
+    def test_purge_deletes_only_expired_rows_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i:03d}', session_data='', expire_date=past) for i in range(5)
+        )
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired session(s)', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [self.session_key])
+
+
+class FlashMessageTests(TestCase):
+
+    def test_messages_write_no_session_row(self):
+        response = self.client.post('/auth/login/', {'email': 'nobody@example.com', 'password': 'whatever1'}, follow=True)
+        self.assertContains(response, 'Invalid email or password.')
+        self.assertFalse(Session.objects.exists())
+
+
+class EmailLoginTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader@example.com', email='reader@example.com', password='s3cret-pass')
+
+    def test_authenticate_is_one_query_on_normalized_email(self):
+        with self.assertNumQueries(1):
+            user = authenticate(email='  Reader@Example.COM ', password='s3cret-pass')
+        self.assertEqual(user, self.user)
+        self.assertIsNone(authenticate(email='reader@example.com', password='wrong-pass'))
+
+    def test_database_rejects_duplicate_email(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='someone-else', email='reader@example.com')
+        # Accounts without an email are not constrained
+        User.objects.create_user(username='blank-1')
+        blank = User.objects.create_user(username='blank-2')
+        # update() skips the pre_save normalization; the index ignores case anyway
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.filter(pk=blank.pk).update(email='READER@example.com')
+
+    def test_every_save_normalizes_the_email(self):
+        admin = User.objects.create_superuser('admin', ' Admin@Example.COM ', 'admin-pass-123')
+        self.assertEqual(User.objects.get(pk=admin.pk).email, 'admin@example.com')
+        self.assertEqual(authenticate(email='admin@example.com', password='admin-pass-123'), admin)
+
+    def test_admin_reports_duplicate_email(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass-123')
+        self.client.force_login(admin)
+        response = self.client.post(f'/admin/auth/user/{admin.pk}/change/', {
+            'username': 'admin', 'email': 'Reader@example.com', 'date_joined_0': '2025-01-01', 'date_joined_1': '00:00:00',
+            'is_active': 'on', 'is_staff': 'on', 'is_superuser': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Another account already uses this email address.')
+        self.assertEqual(User.objects.get(pk=admin.pk).email, 'admin@example.com')
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'drops the unique index with plain DROP INDEX')
+    def test_migration_refuses_duplicates(self):
+        normalize_emails = import_module('authentication.migrations.0003_normalize_user_emails').normalize_emails
+        other = User.objects.create_user(username='other', email='other@example.com')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX auth_user_email_ci_uniq')
+        User.objects.filter(pk=other.pk).update(email=' READER@example.com')
+        with self.assertRaisesMessage(RuntimeError, f'reader@example.com: user ids {self.user.pk}, {other.pk}'):
+            normalize_emails(django_apps, None)
+        # Nothing was blanked or rewritten
+        self.assertEqual(User.objects.get(pk=other.pk).email, ' READER@example.com')
+
+    def test_api_register_duplicate_is_a_400(self):
+        response = self.client.post('/api/auth/register/', {'email': 'READER@example.com', 'password': 'another-pass'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.filter(email='reader@example.com').count(), 1)
+
+
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(AUTH_THROTTLE_RATES={'test_ip': '2/min'})
+    def test_sliding_window(self):
+        self.assertIsNone(hit('test_ip', '10.0.0.1', now=600))
+        self.assertIsNone(hit('test_ip', '10.0.0.1', now=601))
+        self.assertEqual(hit('test_ip', '10.0.0.1', now=602), 58)
+        self.assertIsNone(hit('test_ip', '10.0.0.2', now=602))
+        # Half of the previous (full) window still counts
+        self.assertIsNone(hit('test_ip', '10.0.0.1', now=690))
+        self.assertEqual(hit('test_ip', '10.0.0.1', now=691), 29)
+        self.assertIsNone(hit('test_ip', '10.0.0.1', now=781))
+
+    @override_settings(AUTH_THROTTLE_RATES={'test_ip': '2/min'})
+    def test_rejected_requests_do_not_extend_the_lockout(self):
+        hit('test_ip', '10.0.0.1', now=600)
+        hit('test_ip', '10.0.0.1', now=601)
+        for second in range(602, 660):
+            self.assertIsNotNone(hit('test_ip', '10.0.0.1', now=second))
+        # Only the two accepted requests weigh on the next window
+        self.assertIsNone(hit('test_ip', '10.0.0.1', now=690))
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in check_throttle_cache(None)], ['authentication.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_throttle_cache(None), [])
+
+    @override_settings(AUTH_THROTTLE_RATES={'login_email': '2/min'})
+    def test_login_rejected_before_any_query_or_hashing(self):
+        data = {'email': 'Victim@example.com', 'password': 'guess-1234'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/auth/login/', data).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post('/auth/login/', {**data, 'email': 'victim@example.com '})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(AUTH_THROTTLE_RATES={'login_ip': '1/min'})
+    def test_api_login_throttled_by_ip(self):
+        data = {'email': 'someone@example.com', 'password': 'guess-1234'}
+        self.assertEqual(self.client.post('/api/auth/login/', data).status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/auth/login/', data)
+        self.assertEqual(response.status_code, 429)
+
+
+class OTPStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_code_verifies_once_and_reset_is_consumed_once(self):
+        code = otp.issue('reader@example.com')
+        self.assertEqual(otp.verify('reader@example.com', '0000'), otp.INVALID)
+        self.assertEqual(otp.verify('reader@example.com', code), otp.VERIFIED)
+        self.assertEqual(otp.verify('reader@example.com', code), otp.EXPIRED)
+        self.assertTrue(otp.consume('reader@example.com'))
+        self.assertFalse(otp.consume('reader@example.com'))
+
+    def test_too_many_attempts_burn_the_code(self):
+        code = otp.issue('reader@example.com')
+        for _ in range(otp.OTP_MAX_ATTEMPTS):
+            otp.verify('reader@example.com', '0000')
+        self.assertEqual(otp.verify('reader@example.com', code), otp.LOCKED)
+        self.assertFalse(otp.is_verified('reader@example.com'))
+
+    def test_resending_keeps_the_attempt_count(self):
+        otp.issue('reader@example.com')
+        for _ in range(otp.OTP_MAX_ATTEMPTS - 1):
+            otp.verify('reader@example.com', '0000')
+        code = otp.issue('reader@example.com')
+        self.assertEqual(otp.verify('reader@example.com', '0000'), otp.INVALID)
+        # The last guess was used before the resend
+        self.assertEqual(otp.verify('reader@example.com', code), otp.LOCKED)
+
+    def test_resend_after_lockout_issues_a_usable_code(self):
+        otp.issue('reader@example.com')
+        for _ in range(otp.OTP_MAX_ATTEMPTS + 1):
+            otp.verify('reader@example.com', '0000')
+        self.assertEqual(otp.verify('reader@example.com', '0000'), otp.LOCKED)
+        code = otp.issue('reader@example.com')
+        self.assertEqual(otp.verify('reader@example.com', code), otp.VERIFIED)
+
+    def test_resend_extends_the_attempt_count_with_the_code(self):
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1000):
+            otp.issue('reader@example.com')
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1000 + otp.OTP_TTL - 1):
+            code = otp.issue('reader@example.com')
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=1000 + otp.OTP_TTL + 1):
+            self.assertEqual(otp.verify('reader@example.com', code), otp.VERIFIED)
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in check_otp_cache(None)], ['authentication.W002'])
+
+    def test_reset_flow_writes_no_session_row(self):
+        User.objects.create_user(username='reader@example.com', email='reader@example.com', password='old-pass-123')
+        self.client.post('/auth/forgot-password/', {'email': 'Reader@example.com'})
+        code = OutboxEmail.objects.get().body.split(': ')[1][:4]
+        response = self.client.post('/auth/otp-verification/', {'otp': code})
+        self.assertRedirects(response, '/auth/reset-password/', fetch_redirect_response=False)
+        data = {'new_password': 'Fresh-pass-987', 'confirm_password': 'Fresh-pass-987'}
+        self.assertRedirects(self.client.post('/auth/reset-password/', data), '/auth/login/', fetch_redirect_response=False)
+        self.assertTrue(User.objects.get().check_password('Fresh-pass-987'))
+        self.assertFalse(Session.objects.exists())
+        # The verified reset can't be replayed
+        self.assertEqual(self.client.post('/auth/reset-password/', data).status_code, 302)
+        self.assertFalse(otp.is_verified('reader@example.com'))
@@ -0,0 +1,167 @@
+"""
+Rate limits for the login, registration and password-reset endpoints.
+
+Counters live in the default cache, so every worker shares them (Redis /
+Memcached in production, see CACHES). Each scope + identity (client IP or
+normalized email) gets a sliding-window count: the current fixed window
+plus the previous one weighted by how much of it still overlaps. A check
+runs before the view, so rejected requests never reach the password hasher
+or the mailer. It costs one cache round trip when the request is rejected
+and three when it is let through. Rejected requests are not counted, so
+retrying during a lockout doesn't extend it.
+
+API views use IPRateThrottle / EmailRateThrottle with `throttle_scope`;
+function views use the @rate_limit decorator.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+from .backends import normalize_email
+
+# '<scope>_<key>': '<requests>/<s|min|hour|day>'. A scope + key without a
+# rate is not limited.
+DEFAULT_RATES = {
+    'login_ip': '20/min',
+    'login_email': '5/min',
+    'register_ip': '10/hour',
+    'otp_ip': '10/hour',
+    'otp_email': '5/hour',
+    'otp_verify_ip': '30/hour',
+    'otp_verify_email': '10/hour',
+}
+
+KEY_PREFIX = 'throttle'
+
+
+def parse_rate(rate):
+    # Same format as DRF's DEFAULT_THROTTLE_RATES: '5/min' -> (5, 60)
+    if not rate:
+        return None
+    num, period = rate.split('/')
+    return int(num), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+def get_rate(scope):
+    # settings.AUTH_THROTTLE_RATES overrides (or, with None, disables) a default
+    rates = getattr(settings, 'AUTH_THROTTLE_RATES', {})
+    return parse_rate(rates[scope] if scope in rates else DEFAULT_RATES.get(scope))
+
+
+def _cache_key(scope, ident, window):
+    # Hashed so any email is a valid cache key
+    digest = hashlib.md5(ident.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{scope}:{window}:{digest}'
+
+
+def hit(scope, ident, now=None):
+    """
+    Count one request for `ident` in `scope`. Returns None when it is within
+    the rate, otherwise the seconds to wait before retrying.
+    """
+    rate = get_rate(scope)
+    if rate is None or not ident:
+        return None
+    limit, duration = rate
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, duration)
+    key, previous_key = _cache_key(scope, ident, int(window)), _cache_key(scope, ident, int(window) - 1)
+
+    # Decide before counting, so a rejected request is never counted
+    counts = cache.get_many([key, previous_key])
+    previous = counts.get(previous_key, 0)
+    retry_after = _retry_after(limit, duration, elapsed, counts.get(key, 0) + 1, previous)
+    if retry_after is not None:
+        return retry_after
+
+    cache.add(key, 0, timeout=duration * 2)
+    try:
+        current = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout=duration * 2)
+        current = 1
+    # Concurrent requests may have taken the last slots since get_many()
+    return _retry_after(limit, duration, elapsed, current, previous)
+
+
+def _retry_after(limit, duration, elapsed, current, previous):
+    # None when `current` requests in this window (this one included) fit the rate
+    if current > limit:
+        return math.ceil(duration - elapsed)
+    if current + previous * (1 - elapsed / duration) <= limit:
+        return None
+    # Wait until enough of the previous window has slid out
+    return max(1, math.ceil((1 - (limit - current) / previous) * duration - elapsed))
+
+
+def client_ip(request):
+    # REMOTE_ADDR, or X-Forwarded-For when NUM_PROXIES is configured for DRF
+    return BaseThrottle().get_ident(request)
+
+
+def posted_email(request):
+    return normalize_email(request.POST.get('email')) or None
+
+
+class IPRateThrottle(BaseThrottle):
+    """Limit `<view.throttle_scope>_ip` per client address."""
+    key = 'ip'
+
+    def get_ident_value(self, request):
+        return client_ip(request)
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+        self.retry_after = hit(f'{scope}_{self.key}', self.get_ident_value(request))
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class EmailRateThrottle(IPRateThrottle):
+    """Limit `<view.throttle_scope>_email` per normalized email in the request body."""
+    key = 'email'
+
+    def get_ident_value(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return normalize_email(email if isinstance(email, str) else None) or None
+
+
+def rate_limit(scope, keys=None, methods=('POST',)):
+    """
+    Throttle a function view. `keys` maps a key name to a function returning
+    the identity for a request (default: client IP and the posted email),
+    each limited by the `<scope>_<name>` rate. Over the limit the view isn't
+    called; the response is a plain 429 with Retry-After.
+    """
+    keys = keys if keys is not None else {'ip': client_ip, 'email': posted_email}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                for name, get_ident in keys.items():
+                    retry_after = hit(f'{scope}_{name}', get_ident(request))
+                    if retry_after is not None:
+                        return throttled_response(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def throttled_response(retry_after):
+    response = HttpResponse(
+        f'Too many attempts. Please try again in {retry_after} seconds.',
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -1,13 +1,14 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Blog, Like, Comment
+from .models import Blog, Like, Comment, OutboxEmail
 
 @admin.register(Blog)
 class BlogAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "author", "status", "created_at")
+    list_display = ("id", "title", "author", "status", "like_count", "comment_count", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("title", "author__username")
+    readonly_fields = ("like_count", "comment_count")
 
 
 @admin.register(Like)
@@ -19,4 +20,11 @@ class LikeAdmin(admin.ModelAdmin):
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("id", "blog", "user", "created_at")
-    search_fields = ("blog__title", "user__username", "content")
\ No newline at end of file
+    search_fields = ("blog__title", "user__username", "content")
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "to", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to", "subject")
@@ -6,6 +6,9 @@ class BlogappConfig(AppConfig):
     name = 'blogapp'
     
     def ready(self):
-        # Intentionally left blank; session cleanup is handled by
-        # `ClearSessionsOnFirstRequestMiddleware` to avoid DB access during app init.
-        return
+        # No DB access during app init (expired sessions are purged by
+        # `manage.py purge_sessions`); only signal wiring and the
+        # (filesystem-only) default image scan happen here.
+        from . import signals  # noqa: F401
+        from utils.common import default_image_registry
+        default_image_registry.refresh(force=True)
@@ -1 +1,102 @@
-# calculations work  here like data process
\ No newline at end of file
+# calculations work  here like data process
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Blog, Like
+from .page_cache import LIST_GENERATION_KEY, blog_generation_key, invalidate_pages
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def _lock_blog(cursor, blog_id, user_id):
+    """
+    Lock the blog row and return (like_count, whether `user_id` likes it)
+    in one statement (raises Blog.DoesNotExist). Every like change takes
+    this lock first, so concurrent changes to one blog queue up instead of
+    deadlocking, and the like state read here holds until commit.
+    """
+    table = _q(Blog._meta.db_table)
+    liked = f'EXISTS(SELECT 1 FROM {_q(Like._meta.db_table)} WHERE blog_id = %s AND user_id = %s)'
+    if connection.features.has_select_for_update:
+        cursor.execute(f'SELECT like_count, {liked} FROM {table} WHERE id = %s FOR UPDATE', [blog_id, user_id, blog_id])
+    else:
+        # SQLite: start with a write so the transaction holds the write lock
+        # from its first statement (a read-then-write upgrade can fail as busy)
+        if connection.features.can_return_columns_from_insert:
+            cursor.execute(
+                f'UPDATE {table} SET like_count = like_count WHERE id = %s RETURNING like_count, {liked}',
+                [blog_id, blog_id, user_id],
+            )
+        else:
+            cursor.execute(f'UPDATE {table} SET like_count = like_count WHERE id = %s', [blog_id])
+            cursor.execute(f'SELECT like_count, {liked} FROM {table} WHERE id = %s', [blog_id, user_id, blog_id])
+    row = cursor.fetchone()
+    if row is None:
+        raise Blog.DoesNotExist(f'Blog {blog_id} does not exist')
+    return row[0], bool(row[1])
+
+
+def _insert_like(blog_id, user_id):
+    # The blog lock already rules out duplicates from set_like/toggle_like;
+    # ignore_conflicts covers writers that skip it (Like.save from the admin)
+    Like.objects.bulk_create([Like(blog_id=blog_id, user_id=user_id)], ignore_conflicts=True)
+
+
+def _delete_like(cursor, blog_id, user_id):
+    cursor.execute(
+        f'DELETE FROM {_q(Like._meta.db_table)} WHERE blog_id = %s AND user_id = %s',
+        [blog_id, user_id],
+    )
+
+
+def _bump_count(cursor, blog_id, count, delta):
+    # like_count is unsigned on MySQL, so never compute 0 - 1
+    change = 'like_count + 1' if delta > 0 else 'like_count - 1'
+    guard = '' if delta > 0 else ' AND like_count > 0'
+    changed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    cursor.execute(
+        f'UPDATE {_q(Blog._meta.db_table)} SET like_count = {change}, counters_changed_at = %s WHERE id = %s{guard}',
+        [changed_at, blog_id],
+    )
+    # bulk_create and raw SQL send no Like signals; invalidate the cached pages here
+    invalidate_pages(LIST_GENERATION_KEY, blog_generation_key(blog_id))
+    return max(count + delta, 0)
+
+
+def _change_like(blog_id, user_id, liked):
+    """
+    Three statements when the like changes (lock + state, INSERT or DELETE,
+    counter UPDATE) and one when it already is as asked. `liked=None` flips
+    it. Returns (liked, like_count).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        count, was_liked = _lock_blog(cursor, blog_id, user_id)
+        if liked is None:
+            liked = not was_liked
+        if liked != was_liked:
+            if liked:
+                _insert_like(blog_id, user_id)
+            else:
+                _delete_like(cursor, blog_id, user_id)
+            count = _bump_count(cursor, blog_id, count, 1 if liked else -1)
+    return liked, count
+
+
+def set_like(blog_id, user_id, liked):
+    """
+    Make `user_id`'s like on `blog_id` exist (liked=True) or not.
+    Idempotent and safe under concurrency: the like state is read under the
+    blog row lock, so duplicates never raise IntegrityError and the stored
+    counter moves only when a row really changed. Returns the new
+    like_count without counting likes.
+    """
+    return _change_like(blog_id, user_id, liked)[1]
+
+
+def toggle_like(blog_id, user_id):
+    """
+    Flip the like: remove it if present, otherwise add it.
+    Returns (liked, like_count).
+    """
+    return _change_like(blog_id, user_id, None)
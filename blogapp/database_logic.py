@@ -1 +1,135 @@
 # //database related work will be done here
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from utils.common import encode_cursor, decode_cursor
+from .models import Blog, Comment, Like
+from .page_cache import LIST_GENERATION_KEY, blog_generation_key, invalidate_pages
+from .search import reindex_blogs
+
+# Number of cards shown per listing page
+LISTING_PAGE_SIZE = 12
+
+# Comments shown on blog_detail and returned per "load more"
+COMMENT_PAGE_SIZE = 20
+
+
+def blog_listing(**filters):
+    """
+    Queryset for the card listings (home, blog_list, my_blogs).
+    Everything a card renders comes back in a single query: the author via a
+    join, the like count from the stored counter and the stored excerpt
+    instead of the full TextField.
+    """
+    return (
+        Blog.objects.filter(**filters)
+        .select_related('author')
+        .defer('content')
+        .order_by('-created_at', '-id')
+    )
+
+
+def comment_stream(blog_id):
+    """
+    A blog's comments, newest first, for keyset paging. The commenter comes
+    from the same query and only the columns the comment list shows are read.
+    """
+    return (
+        Comment.objects.filter(blog_id=blog_id)
+        .select_related('user')
+        .only('id', 'blog_id', 'content', 'created_at', 'user', 'user__username')
+        .order_by('-created_at', '-id')
+    )
+
+
+def keyset_page(queryset, cursor=None, page_size=LISTING_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for the page that starts after `cursor`.
+    The queryset must be ordered by ('-created_at', '-id'); paging is done
+    with a WHERE on that key instead of OFFSET, so every page costs the same
+    no matter how deep the reader goes.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk, _ = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+    return rows, next_cursor
+
+
+async def akeyset_page(queryset, cursor=None, page_size=LISTING_PAGE_SIZE):
+    """
+    keyset_page for async views: same paging, rows fetched with async iteration.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk, _ = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = [row async for row in queryset[:page_size + 1]]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+    return rows, next_cursor
+
+
+def liked_blog_ids(user, blog_ids):
+    """
+    Set of the given blog ids that `user` has liked, fetched in one query.
+    """
+    if not user.is_authenticated or not blog_ids:
+        return set()
+    return set(Like.objects.filter(user=user, blog_id__in=blog_ids).values_list('blog_id', flat=True))
+
+
+async def aliked_blog_ids(user, blog_ids):
+    """
+    liked_blog_ids for async views.
+    """
+    if not user.is_authenticated or not blog_ids:
+        return set()
+    return {pk async for pk in Like.objects.filter(user=user, blog_id__in=blog_ids).values_list('blog_id', flat=True)}
+
+
+def blogs_changed_in_bulk(blog_ids):
+    """
+    Side effects the Blog signals would have had, for rows written with
+    update() / bulk_create(): page caches and the search index.
+    """
+    invalidate_pages(LIST_GENERATION_KEY, *(blog_generation_key(pk) for pk in blog_ids))
+    reindex_blogs(blog_ids)
+
+
+def set_blogs_status(blog_ids, status):
+    """
+    Move the given blogs to `status` with a single UPDATE ... WHERE id IN.
+    Returns the number of rows changed.
+    """
+    if not blog_ids:
+        return 0
+    # update() skips auto_now, so stamp updated_at explicitly (conditional GET relies on it)
+    changed = Blog.objects.filter(pk__in=blog_ids).update(status=status, updated_at=timezone.now())
+    blogs_changed_in_bulk(blog_ids)
+    return changed
+
+
+def create_blogs(blogs):
+    """
+    INSERT new (unsaved) blogs and fill in their ids. Call inside a transaction.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        # One multi-row INSERT ... RETURNING (SQLite, PostgreSQL, MariaDB)
+        Blog.objects.bulk_create(blogs)
+        blogs_changed_in_bulk([blog.pk for blog in blogs])
+        return
+    # Plain MySQL returns no ids from a multi-row INSERT, and with interleaved
+    # auto-increment locking they can't be derived from LAST_INSERT_ID(), so
+    # insert row by row; save() runs the Blog signals itself.
+    for blog in blogs:
+        blog.save(force_insert=True)
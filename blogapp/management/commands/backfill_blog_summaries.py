@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blogapp.models import Blog
+from blogapp.page_cache import LIST_GENERATION_KEY, blog_generation_key, invalidate_pages
+
+
+class Command(BaseCommand):
+    help = "Fill in Blog.excerpt / word_count / reading_time for existing blogs (run once after migrating)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many blogs are out of date.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        fields = Blog.SUMMARY_FIELDS
+        changed = 0
+        last_id = 0
+
+        while True:
+            # Walk the table by primary key so each batch is a short transaction
+            with transaction.atomic():
+                blogs = list(
+                    Blog.objects.filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .only('id', 'content', *fields)[:batch_size]
+                )
+                if not blogs:
+                    break
+                stale = []
+                for blog in blogs:
+                    stored = [getattr(blog, field) for field in fields]
+                    blog.update_summary()
+                    if stored != [getattr(blog, field) for field in fields]:
+                        stale.append(blog)
+                if stale and not dry_run:
+                    # bulk_update leaves updated_at alone: the post itself did not change
+                    Blog.objects.bulk_update(stale, fields)
+                    invalidate_pages(LIST_GENERATION_KEY, *(blog_generation_key(blog.pk) for blog in stale))
+                changed += len(stale)
+                last_id = blogs[-1].pk
+
+        verb = "would be updated" if dry_run else "updated"
+        self.stdout.write(self.style.SUCCESS(f"{changed} blog(s) {verb}."))
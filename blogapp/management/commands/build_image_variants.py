@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blogapp.models import Blog
+from utils.common import DEFAULT_BLOG_IMAGES
+from utils.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Generate missing resized variants for every blog image and the default images."
+
+    def handle(self, *args, **options):
+        media_root = str(settings.MEDIA_ROOT)
+        names = set(DEFAULT_BLOG_IMAGES)
+        names.update(
+            Blog.objects.exclude(image='').exclude(image=None)
+            .values_list('image', flat=True).distinct().iterator()
+        )
+        written = 0
+        for name in sorted(names):
+            try:
+                created = generate_variants(name, media_root)
+            except OSError as e:
+                self.stderr.write(f"Skipping {name}: {e}")
+                continue
+            written += len(created)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} variant file(s) for {len(names)} image(s)."))
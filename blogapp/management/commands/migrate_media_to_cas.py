@@ -0,0 +1,58 @@
+import os
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from blogapp.models import Blog, MediaBlob
+from utils.common import DEFAULT_BLOG_IMAGES
+from utils.storage import blog_image_storage, is_hashed_name
+
+
+class Command(BaseCommand):
+    help = "Move existing blog images into content-addressed storage, deduplicating identical files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the files that would move.")
+        parser.add_argument('--keep-originals', action='store_true',
+                            help="Leave the old files in place after copying them.")
+
+    def handle(self, *args, **options):
+        storage = blog_image_storage
+        legacy_names = (
+            Blog.objects.exclude(image='').exclude(image=None)
+            .values_list('image', flat=True).distinct()
+        )
+        moved = missing = 0
+        for old_name in list(legacy_names):
+            if is_hashed_name(old_name):
+                continue
+            if not storage.exists(old_name):
+                self.stderr.write(f"Missing file, skipped: {old_name}")
+                missing += 1
+                continue
+            if options['dry_run']:
+                self.stdout.write(f"Would move {old_name}")
+                continue
+
+            try:
+                with transaction.atomic():
+                    blogs = Blog.objects.select_for_update().filter(image=old_name)
+                    ids = list(blogs.values_list('pk', flat=True))
+                    with storage.open(old_name, 'rb') as fh:
+                        new_name = storage.save(old_name, File(fh, name=os.path.basename(old_name)))
+                    # save() took one reference; every other blog sharing the file takes one more
+                    MediaBlob.objects.filter(name=new_name).update(refcount=F('refcount') + len(ids) - 1)
+                    Blog.objects.filter(pk__in=ids).update(image=new_name)
+            except SuspiciousFileOperation:
+                # Only images get a content-addressed name; the file stays where it is
+                self.stderr.write(f"Not an image, skipped: {old_name}")
+                continue
+
+            self.stdout.write(f"{old_name} -> {new_name} ({len(ids)} blog(s))")
+            moved += 1
+            # Default images stay where they are: they are also used by blogs without uploads
+            if not options['keep_originals'] and old_name not in DEFAULT_BLOG_IMAGES:
+                storage.delete(old_name)
+
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} file(s); {missing} missing."))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from blogapp.models import Blog, Like, Comment
+
+
+def _count_subquery(model):
+    counts = (
+        model.objects.filter(blog=OuterRef('pk'))
+        .order_by()
+        .values('blog')
+        .annotate(c=Count('pk'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Recompute Blog.like_count / Blog.comment_count and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report blogs whose counters are wrong.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        fixed = 0
+        last_id = 0
+
+        while True:
+            # Walk the table by primary key so each batch is a short transaction
+            with transaction.atomic():
+                rows = list(
+                    Blog.objects.filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .annotate(real_likes=_count_subquery(Like), real_comments=_count_subquery(Comment))
+                    .values_list('pk', 'like_count', 'comment_count', 'real_likes', 'real_comments')[:batch_size]
+                )
+                if not rows:
+                    break
+                for pk, like_count, comment_count, real_likes, real_comments in rows:
+                    if like_count == real_likes and comment_count == real_comments:
+                        continue
+                    fixed += 1
+                    self.stdout.write(
+                        f"Blog {pk}: likes {like_count} -> {real_likes}, comments {comment_count} -> {real_comments}"
+                    )
+                    if not dry_run:
+                        # Recount in the UPDATE itself so writes since the read are not lost
+                        Blog.objects.filter(pk=pk).update(
+                            like_count=_count_subquery(Like),
+                            comment_count=_count_subquery(Comment),
+                            counters_changed_at=timezone.now(),
+                        )
+                last_id = rows[-1][0]
+
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} blog(s) {verb}."))
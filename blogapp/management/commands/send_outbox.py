@@ -0,0 +1,131 @@
+import time
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from blogapp.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox over a single reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--max-attempts', type=int, default=8,
+                            help="Give up (status=failed) after this many attempts.")
+        parser.add_argument('--backoff', type=float, default=30.0,
+                            help="Base retry delay in seconds; doubles on every attempt.")
+        parser.add_argument('--lease', type=float, default=1800.0,
+                            help="Seconds a claimed batch stays reserved for this worker; "
+                                 "should exceed batch size x EMAIL_TIMEOUT.")
+        parser.add_argument('--backend', default=None,
+                            help="Email backend to deliver with (defaults to EMAIL_BACKEND), "
+                                 "e.g. django.core.mail.backends.filebased.EmailBackend.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain what is due and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        connection = get_connection(backend=options['backend'])
+        total = 0
+        try:
+            while True:
+                processed = self.deliver_batch(connection)
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} outbox email(s)."))
+
+    def claim_batch(self):
+        """
+        Lease one batch of due emails to this worker and commit at once, so
+        no row lock is held while talking to the mail server. Claimed rows
+        are 'sending' until the lease runs out; if this worker dies they are
+        picked up again then (the claim already counted the attempt).
+        SKIP LOCKED lets several workers claim in parallel.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:self.options['batch_size']]
+            )
+            if batch:
+                lease_until = now + timedelta(seconds=self.options['lease'])
+                OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                    status='sending', next_attempt_at=lease_until, attempts=F('attempts') + 1,
+                )
+        for email in batch:
+            email.status = 'sending'
+            email.attempts += 1
+        return batch
+
+    def deliver_batch(self, connection):
+        """
+        Claim and send one batch of due emails. Returns the number of rows processed.
+        """
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+
+        # Opening an already open connection is a no-op, so the SMTP session
+        # is reused across batches until a send fails
+        try:
+            connection.open()
+        except Exception as e:
+            for email in batch:
+                self.schedule_retry(email, e)
+                self.finish(email)
+            return len(batch)
+
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.to],
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                self.schedule_retry(email, e)
+                # The session may be broken; the next batch opens a fresh one
+                connection.close()
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+            self.finish(email)
+        return len(batch)
+
+    def finish(self, email):
+        # Only while our lease holds: after it expired another worker may
+        # have claimed the row (and bumped attempts) again
+        OutboxEmail.objects.filter(pk=email.pk, status='sending', attempts=email.attempts).update(
+            status=email.status, next_attempt_at=email.next_attempt_at,
+            last_error=email.last_error, sent_at=email.sent_at,
+        )
+
+    def schedule_retry(self, email, error):
+        email.last_error = str(error)
+        email.status = 'pending'
+        if email.attempts >= self.options['max_attempts']:
+            email.status = 'failed'
+            self.stderr.write(f"Giving up on outbox email {email.id} to {email.to}: {error}")
+            return
+        delay = self.options['backoff'] * (2 ** (email.attempts - 1))
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.stderr.write(f"Outbox email {email.id} failed (attempt {email.attempts}), retrying in {delay:.0f}s: {error}")
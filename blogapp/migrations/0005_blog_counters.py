@@ -0,0 +1,44 @@
+# Generated by hand to add denormalized like/comment counters and backfill them
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    from django.db.models import Count, IntegerField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+
+    Blog = apps.get_model('blogapp', 'Blog')
+    Like = apps.get_model('blogapp', 'Like')
+    Comment = apps.get_model('blogapp', 'Comment')
+
+    def count_of(model):
+        counts = (
+            model.objects.filter(blog=OuterRef('pk'))
+            .order_by()
+            .values('blog')
+            .annotate(c=Count('pk'))
+            .values('c')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Blog.objects.update(like_count=count_of(Like), comment_count=count_of(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0004_comment_like'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
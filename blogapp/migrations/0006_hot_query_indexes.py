@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0005_blog_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='blog_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='blog_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', 'created_at', 'id'], name='comment_blog_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:25
+
+import utils.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0007_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=utils.storage.get_blog_image_storage, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by hand for the full-text search backends (blogapp/search.py)
+
+from django.db import migrations
+
+FTS_TABLE = 'blogapp_blog_fts'
+FULLTEXT_INDEX = 'blog_title_content_ft'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON blogapp_blog (title, content)')
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            # SQLite built without FTS5: blogapp.search falls back to its in-memory index
+            return
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content) "
+            f"SELECT id, title, content FROM blogapp_blog WHERE status = 'published'"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX {FULLTEXT_INDEX} ON blogapp_blog')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0008_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0009_blog_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=153),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0010_blog_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:37
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0011_outbox_sending_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='counters_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['status', 'updated_at', 'counters_changed_at'], name='blog_status_validators_idx'),
+        ),
+    ]
@@ -1,6 +1,17 @@
-from django.db import models
+import math
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
-from utils.common import get_default_blog_image
+from django.utils import timezone
+from utils.common import get_default_blog_image, truncate_text
+from utils.images import srcset, variant_url
+from utils.storage import get_blog_image_storage
+
+# Blog.excerpt is truncate_text(content, EXCERPT_LENGTH)
+EXCERPT_LENGTH = 150
+
+# Reading speed behind Blog.reading_time
+WORDS_PER_MINUTE = 200
 
 class Blog(models.Model):
     STATUS_CHOICES = [
@@ -11,15 +22,50 @@ class Blog(models.Model):
     title = models.CharField(max_length=200)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
-    # Store only filenames at upload time (no folder prefix)
-    image = models.ImageField(upload_to='', null=True, blank=True)
+    # Uploads are stored by content hash (images/ab/cd/<sha256>.<ext>), deduplicated
+    image = models.ImageField(upload_to='', storage=get_blog_image_storage, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, maintained by Like/Comment writes (see signals.py)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Set by every counter update, so API validators see likes/comments move
+    counters_changed_at = models.DateTimeField(default=timezone.now)
+    # Derived from content on save (see update_summary), so listings never read content
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH + 3, blank=True, default='')
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveSmallIntegerField(default=1, help_text='Minutes')
+
+    # Fields only ever changed through F() updates, never through Blog.save()
+    COUNTER_FIELDS = ('like_count', 'comment_count', 'counters_changed_at')
+
+    # Fields update_summary() computes from content
+    SUMMARY_FIELDS = ('excerpt', 'word_count', 'reading_time')
+
+    class Meta:
+        indexes = [
+            # Published listing / API list: WHERE status = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['status', '-created_at', '-id'], name='blog_status_created_idx'),
+            # My Blogs: WHERE author_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['author', '-created_at', '-id'], name='blog_author_created_idx'),
+            # API list validators: COUNT / MAX(updated_at) / MAX(counters_changed_at)
+            # WHERE status = ?, answered from the index alone
+            models.Index(fields=['status', 'updated_at', 'counters_changed_at'], name='blog_status_validators_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
+    def get_image_name(self):
+        """
+        Returns the storage name of the uploaded image, or of this blog's default image.
+        """
+        if self.image and hasattr(self.image, 'name') and self.image.name:
+            return self.image.name
+        # Default image is picked from the id, so it is stable for this blog
+        return get_default_blog_image(self.pk)
+
     def get_image_url(self):
         """
         Returns the image URL or default image URL if no image is set.
@@ -27,17 +73,50 @@ class Blog(models.Model):
         if self.image and hasattr(self.image, 'name') and self.image.name:
             return self.image.url
         else:
-            # Return default image URL
-            default_image = get_default_blog_image()
+            default_image = get_default_blog_image(self.pk)
             return f"/media/{default_image}"
+
+    def get_image_variants(self):
+        """
+        Returns srcset strings of the resized variants keyed by format ('webp',
+        'jpeg') plus a mid-size JPEG 'src' for the plain <img> fallback.
+        """
+        name = self.get_image_name()
+        return {
+            'webp': srcset(name, 'webp'),
+            'jpeg': srcset(name, 'jpeg'),
+            'src': variant_url(name, 640, 'jpeg'),
+        }
     
+    def update_summary(self):
+        """
+        Recompute excerpt, word_count and reading_time from content.
+        save() calls this; code that skips save() (bulk_create) must too.
+        """
+        content = self.content or ''
+        self.excerpt = truncate_text(content, EXCERPT_LENGTH)
+        self.word_count = len(content.split())
+        self.reading_time = max(1, math.ceil(self.word_count / WORDS_PER_MINUTE))
+
     def save(self, *args, **kwargs):
         """
-        Override save method to set default image if none provided.
+        Override save method to keep stored counters out of regular saves
+        and the content summary in step with content.
+        Blogs without an upload keep an empty image; get_image_url() resolves
+        their default image from the id at render time.
         """
-        # If no image is provided and this is a new instance, set default image
-        if not self.pk and not self.image:
-            self.image = get_default_blog_image()
+        # Never write back counters loaded earlier: a concurrent like/comment
+        # would otherwise be lost when an existing blog is edited and saved.
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_summary()
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, *(f for f in self.SUMMARY_FIELDS if f not in update_fields)]
         super().save(*args, **kwargs)
 
 
@@ -52,6 +131,16 @@ class Like(models.Model):
     def __str__(self):
         return f"{self.user.username} likes {self.blog.title}"
 
+    def save(self, *args, **kwargs):
+        # Insert and counter update share one transaction
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                Blog.objects.filter(pk=self.blog_id).update(
+                    like_count=F('like_count') + 1, counters_changed_at=timezone.now(),
+                )
+
 
 class Comment(models.Model):
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='comments')
@@ -60,5 +149,70 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Comment threads: WHERE blog_id = ? ORDER BY created_at, id
+            models.Index(fields=['blog', 'created_at', 'id'], name='comment_blog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Comment by {self.user.username} on {self.blog.title}"
+
+    def save(self, *args, **kwargs):
+        # Insert and counter update share one transaction
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                Blog.objects.filter(pk=self.blog_id).update(
+                    comment_count=F('comment_count') + 1, counters_changed_at=timezone.now(),
+                )
+
+
+
+class MediaBlob(models.Model):
+    """
+    Reference count for one content-addressed file (see utils/storage.py).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued during a request and delivered later by `manage.py send_outbox`.
+    Rows are written in the caller's transaction, so a rolled-back request
+    never sends mail. A worker marks the rows it is delivering 'sending' with
+    next_attempt_at as the lease expiry; rows whose worker died become due again.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker poll: WHERE status IN ('pending', 'sending') AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.blog.title}"
\ No newline at end of file
+        return f"{self.subject} -> {self.to} ({self.status})"
@@ -0,0 +1,137 @@
+# Full-page cache for the public blog pages (home, blog_detail)
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+# Seconds a rendered page is kept; generation bumps invalidate it earlier
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+# Bumped by any change visible on listing pages
+LIST_GENERATION_KEY = 'pagecache:gen:list'
+
+
+def blog_generation_key(blog_id):
+    # Bumped by any change visible on one blog's detail page
+    return f'pagecache:gen:blog:{blog_id}'
+
+
+def _fresh_generation():
+    # Time based so a generation lost to eviction never restarts at an old value
+    return int(time.time() * 1000)
+
+
+def bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_generation(), None)
+
+
+def invalidate_pages(*keys):
+    # After commit, so a concurrent request can't re-cache the old state
+    transaction.on_commit(lambda: [bump_generation(key) for key in keys])
+
+
+def current_generations(keys):
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _fresh_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+async def acurrent_generations(keys):
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, _fresh_generation(), None)
+            generations[key] = await cache.aget(key)
+    return [generations[key] for key in keys]
+
+
+def _page_key(request, generations):
+    stamp = '.'.join(str(g) for g in generations)
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'pagecache:page:{stamp}:{path_hash}'
+
+
+def _cached_response(request, content):
+    # Make sure the CSRF cookie is issued; the JS reads it for POSTs
+    get_token(request)
+    response = HttpResponse(content)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _start_render(request):
+    # Cleared so _cacheable() can tell whether rendering asked for a CSRF token
+    request.META['CSRF_COOKIE_NEEDS_UPDATE'] = False
+
+
+def _cacheable(request, response):
+    # A page that rendered {% csrf_token %} (get_token() sets the flag) holds
+    # this viewer's secret and must never be served to anyone else
+    token_rendered = request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    get_token(request)
+    return response.status_code == 200 and not response.streaming and not token_rendered
+
+
+def cache_page_shell(generation_keys):
+    """
+    Cache a view's rendered HTML for everyone, anonymous or not.
+
+    The wrapped view must render a "shell" that does not depend on the
+    viewer: per-user bits (nav, like state, owner buttons, flash messages)
+    are filled in by blog_actions.js from the viewer_state endpoint, and
+    forms carry an empty csrfmiddlewaretoken the JS fills from the cookie.
+    Responses that rendered a CSRF token anyway are not cached.
+    `generation_keys(*args, **kwargs)` lists the generation counters the
+    page depends on; bumping any of them (see signals.py) makes every
+    cached copy unreachable. A hit touches neither the session nor the
+    user, so it runs no DB queries. Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+
+                cache_key = _page_key(request, await acurrent_generations(generation_keys(*args, **kwargs)))
+                content = await cache.aget(cache_key)
+                if content is not None:
+                    return _cached_response(request, content)
+
+                _start_render(request)
+                response = await view(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    await cache.aset(cache_key, response.content, PAGE_CACHE_TIMEOUT)
+                    response['X-Page-Cache'] = 'miss'
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            cache_key = _page_key(request, current_generations(generation_keys(*args, **kwargs)))
+            content = cache.get(cache_key)
+            if content is not None:
+                return _cached_response(request, content)
+
+            _start_render(request)
+            response = view(request, *args, **kwargs)
+            if _cacheable(request, response):
+                cache.set(cache_key, response.content, PAGE_CACHE_TIMEOUT)
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
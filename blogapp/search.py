@@ -0,0 +1,233 @@
+# Full-text search over published blogs (title + content)
+import math
+import re
+import threading
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 table created by migration 0009 (rowid = blog id)
+FTS_TABLE = 'blogapp_blog_fts'
+
+# MySQL FULLTEXT index created by migration 0009
+FULLTEXT_INDEX = 'blog_title_content_ft'
+
+# A title match counts this many times more than a content match
+TITLE_WEIGHT = 10.0
+
+# Deepest hit a results page may start at. Nobody reads that far, and an
+# unbounded ?page= would overflow the OFFSET the database accepts.
+MAX_SEARCH_OFFSET = 10000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+class MySQLFullTextBackend:
+    """
+    MATCH ... AGAINST on the FULLTEXT index. MySQL keeps the index up to date
+    itself, so the signal hooks have nothing to do.
+    """
+
+    def search(self, terms, offset, limit):
+        from .models import Blog
+
+        # Boolean mode with '+' so every term must appear, like the other backends
+        against = ' '.join(f'+{term}' for term in terms)
+        match = 'MATCH (title, content) AGAINST (%s IN BOOLEAN MODE)'
+        return list(
+            Blog.objects.filter(RawSQL(match, [against], output_field=BooleanField()), status='published')
+            .annotate(score=RawSQL(match, [against], output_field=FloatField()))
+            .order_by('-score', '-id')
+            .values_list('id', 'score')[offset:offset + limit]
+        )
+
+    def index_blog(self, blog):
+        pass
+
+    def remove_blog(self, blog_id):
+        pass
+
+
+class SQLiteFTSBackend:
+    """
+    FTS5 table holding the title and content of published blogs, ranked with
+    bm25(). Rows are written in the same transaction as the blog itself.
+    """
+
+    def search(self, terms, offset, limit):
+        # Quote every term so user input can never be read as FTS5 syntax
+        match = ' '.join(f'"{term}"' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, -bm25({FTS_TABLE}, %s, 1.0) AS score FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY score DESC, rowid DESC LIMIT %s OFFSET %s',
+                [TITLE_WEIGHT, match, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def index_blog(self, blog):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [blog.pk])
+            if blog.status == 'published':
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)',
+                    [blog.pk, blog.title, blog.content],
+                )
+
+    def remove_blog(self, blog_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [blog_id])
+
+
+class InMemoryIndex:
+    """
+    Pure-Python inverted index for databases without a full-text engine.
+    Built from the database on first use, then kept current by the signal
+    hooks (after commit). It lives in the worker process, so each worker
+    holds its own copy.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built = False
+        # term -> {blog_id: weighted term frequency}
+        self.postings = defaultdict(dict)
+        # blog_id -> (weighted document length, terms)
+        self.documents = {}
+
+    def _add(self, blog_id, title, content):
+        frequencies = defaultdict(float)
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        for term in tokenize(content):
+            frequencies[term] += 1.0
+        for term, frequency in frequencies.items():
+            self.postings[term][blog_id] = frequency
+        self.documents[blog_id] = (sum(frequencies.values()), tuple(frequencies))
+
+    def _remove(self, blog_id):
+        _, terms = self.documents.pop(blog_id, (0, ()))
+        for term in terms:
+            self.postings[term].pop(blog_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def _build(self):
+        from .models import Blog
+
+        rows = Blog.objects.filter(status='published').values_list('id', 'title', 'content')
+        for blog_id, title, content in rows.iterator(chunk_size=2000):
+            self._add(blog_id, title, content)
+        self.built = True
+
+    def search(self, terms, offset, limit):
+        with self.lock:
+            if not self.built:
+                self._build()
+            postings = [self.postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            # BM25 over the weighted frequencies; every term must match
+            total = len(self.documents)
+            average_length = sum(length for length, _ in self.documents.values()) / total
+            candidates = set.intersection(*(set(p) for p in postings))
+            scores = []
+            for blog_id in candidates:
+                length = self.documents[blog_id][0]
+                score = 0.0
+                for posting in postings:
+                    idf = math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+                    tf = posting[blog_id]
+                    score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / average_length))
+                scores.append((blog_id, score))
+        scores.sort(key=lambda hit: (-hit[1], -hit[0]))
+        return scores[offset:offset + limit]
+
+    def index_blog(self, blog):
+        blog_id, title, content, published = blog.pk, blog.title, blog.content, blog.status == 'published'
+
+        def apply():
+            with self.lock:
+                if not self.built:
+                    return
+                self._remove(blog_id)
+                if published:
+                    self._add(blog_id, title, content)
+        # The in-memory copy must never see changes that are later rolled back
+        transaction.on_commit(apply)
+
+    def remove_blog(self, blog_id):
+        def apply():
+            with self.lock:
+                if self.built:
+                    self._remove(blog_id)
+        transaction.on_commit(apply)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _fts_table_exists():
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_search_backend():
+    """
+    The backend for the default database: MySQL FULLTEXT, SQLite FTS5 (when
+    the migration could create the table) or the in-memory index.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if connection.vendor == 'mysql':
+                _backend = MySQLFullTextBackend()
+            elif connection.vendor == 'sqlite' and _fts_table_exists():
+                _backend = SQLiteFTSBackend()
+            else:
+                _backend = InMemoryIndex()
+        return _backend
+
+
+def reindex_blogs(blog_ids):
+    """
+    Bring the index up to date for blogs written with queryset.update() or
+    bulk_create(), which send no signals.
+    """
+    from .models import Blog
+
+    backend = get_search_backend()
+    if isinstance(backend, MySQLFullTextBackend) or not blog_ids:
+        return
+    for blog in Blog.objects.filter(pk__in=blog_ids).only('id', 'title', 'content', 'status'):
+        backend.index_blog(blog)
+
+
+class SearchResults:
+    """
+    Lazily evaluated, ranked search hits. Slicing runs the search for just
+    that window and returns the matching rows of `queryset` in rank order,
+    each with a `search_score` attribute.
+    """
+
+    def __init__(self, query, queryset):
+        self.terms = tokenize(query)
+        self.queryset = queryset
+
+    def __getitem__(self, window):
+        if not self.terms:
+            return []
+        start = window.start or 0
+        hits = get_search_backend().search(self.terms, start, window.stop - start)
+        rows = self.queryset.in_bulk([blog_id for blog_id, _ in hits])
+        results = []
+        for blog_id, score in hits:
+            if blog_id in rows:
+                rows[blog_id].search_score = score
+                results.append(rows[blog_id])
+        return results
@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from utils.images import schedule_variants
+from utils.storage import blog_image_storage
+from .search import get_search_backend
+from .page_cache import LIST_GENERATION_KEY, blog_generation_key, invalidate_pages
+from .models import Blog, Like, Comment
+
+
+# Deletes run inside the deletion collector's transaction, so the counter
+# update commits (or rolls back) together with the row removal. This also
+# covers cascades, e.g. deleting a user removes their likes and comments.
+@receiver(pre_delete, sender=Blog)
+def remember_deleted_blog(sender, instance, origin=None, **kwargs):
+    # The collector sends pre_delete for every blog before any cascaded
+    # Like/Comment post_delete, so the set is complete when those run.
+    if origin is not None:
+        vars(origin).setdefault('_deleted_blog_ids', set()).add(instance.pk)
+
+
+def blog_is_deleted(instance, origin):
+    # Counters of a blog removed by the same delete() need no UPDATE
+    return instance.blog_id in vars(origin).get('_deleted_blog_ids', ()) if origin is not None else False
+
+
+@receiver(post_delete, sender=Like)
+def decrement_like_count(sender, instance, origin=None, **kwargs):
+    if blog_is_deleted(instance, origin):
+        return
+    Blog.objects.filter(pk=instance.blog_id, like_count__gt=0).update(
+        like_count=F('like_count') - 1, counters_changed_at=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    if blog_is_deleted(instance, origin):
+        return
+    Blog.objects.filter(pk=instance.blog_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1, counters_changed_at=timezone.now(),
+    )
+
+
+@receiver(post_init, sender=Blog)
+def remember_image_name(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred image column is never loaded here;
+    # None means "not loaded" and is resolved before a save or delete needs it
+    if 'image' in instance.__dict__:
+        image = instance.__dict__['image']
+        instance._loaded_image_name = getattr(image, 'name', image) or ''
+    else:
+        instance._loaded_image_name = None
+
+
+def stored_image_name(instance):
+    # The image name currently in the row, read from the DB if it was deferred
+    if getattr(instance, '_loaded_image_name', None) is None:
+        name = Blog.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+        instance._loaded_image_name = name or ''
+    return instance._loaded_image_name
+
+
+@receiver(pre_save, sender=Blog)
+def load_replaced_image_name(sender, instance, **kwargs):
+    # Image assigned on an instance loaded without it: fetch the name it replaces
+    if not instance._state.adding and 'image' in instance.__dict__:
+        stored_image_name(instance)
+
+
+@receiver(post_save, sender=Blog)
+def image_changed(sender, instance, created, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    name = instance.image.name if instance.image else ''
+    previous = '' if created else instance._loaded_image_name
+    if name != previous:
+        if name:
+            # Resize only once the upload is committed and on disk
+            transaction.on_commit(lambda: schedule_variants(name))
+        if previous:
+            blog_image_storage.release(previous)
+    instance._loaded_image_name = name
+
+
+@receiver(pre_delete, sender=Blog)
+def load_deleted_image_name(sender, instance, **kwargs):
+    # The row is gone by post_delete
+    stored_image_name(instance)
+
+
+@receiver(post_delete, sender=Blog)
+def release_blog_image(sender, instance, **kwargs):
+    # The name as stored in the row, even if the instance was modified since
+    name = instance._loaded_image_name
+    if name:
+        blog_image_storage.release(name)
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_pages(sender, instance, **kwargs):
+    invalidate_pages(LIST_GENERATION_KEY, blog_generation_key(instance.pk))
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_like_pages(sender, instance, origin=None, **kwargs):
+    if blog_is_deleted(instance, origin):
+        return
+    # Like counts show on the cards and on the detail page
+    invalidate_pages(LIST_GENERATION_KEY, blog_generation_key(instance.blog_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, origin=None, **kwargs):
+    if blog_is_deleted(instance, origin):
+        return
+    invalidate_pages(blog_generation_key(instance.blog_id))
+
+
+@receiver(post_save, sender=Blog)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    # Counter-only saves can't change what is searchable
+    if update_fields and not {'title', 'content', 'status'} & set(update_fields):
+        return
+    get_search_backend().index_blog(instance)
+
+
+@receiver(post_delete, sender=Blog)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove_blog(instance.pk)
@@ -66,6 +66,68 @@ document.addEventListener("DOMContentLoaded", function () {
   // run auto-dismiss on DOM ready
   autoDismissAlerts(4000);
 
+  // Cached page shells (home, blog detail) are identical for every visitor;
+  // fetch who is looking and fill in the per-user parts.
+  function showIf(el, visible) {
+    el.classList.toggle("d-none", !visible);
+  }
+
+  function applyViewerState(state) {
+    const username = state.username || "";
+    document.querySelectorAll(".user-only").forEach((el) => showIf(el, state.authenticated));
+    document.querySelectorAll(".anon-only").forEach((el) => showIf(el, !state.authenticated));
+    document.querySelectorAll(".viewer-first-name").forEach((el) => {
+      el.textContent = state.first_name;
+    });
+    document.querySelectorAll(".owner-only").forEach((el) => {
+      showIf(el, state.authenticated && el.dataset.author === username);
+    });
+    const commentsList = document.getElementById("comments-list");
+    if (commentsList) {
+      commentsList.dataset.currentUser = username;
+      const isBlogAuthor = state.authenticated && commentsList.dataset.blogAuthor === username;
+      document.querySelectorAll(".comment-owner-only").forEach((el) => {
+        showIf(el, state.authenticated && (el.dataset.user === username || isBlogAuthor));
+      });
+    }
+    const liked = new Set(state.liked.map(String));
+    document.querySelectorAll(".like-form").forEach((form) => {
+      form.querySelector(".like-button").textContent = liked.has(form.dataset.blogId) ? "Unlike" : "Like";
+    });
+    document.querySelectorAll(".liked-badge").forEach((badge) => {
+      showIf(badge, liked.has(badge.dataset.blogId));
+    });
+    const container = document.getElementById("messages");
+    state.messages.forEach((m) => {
+      const div = document.createElement("div");
+      div.className = `alert alert-${m.tags} alert-dismissible fade show`;
+      div.setAttribute("role", "alert");
+      div.textContent = m.message;
+      const close = document.createElement("button");
+      close.type = "button";
+      close.className = "btn-close";
+      close.setAttribute("data-bs-dismiss", "alert");
+      close.setAttribute("aria-label", "Close");
+      div.appendChild(close);
+      container.appendChild(div);
+    });
+    if (state.messages.length) autoDismissAlerts(4000);
+  }
+
+  if (document.body.dataset.pageShell) {
+    // Cached HTML carries no CSRF token; forms post the one from our cookie
+    document.querySelectorAll('input[name="csrfmiddlewaretoken"]').forEach((input) => {
+      input.value = getCSRFToken();
+    });
+    const ids = new Set();
+    document.querySelectorAll("[data-blog-id]").forEach((el) => ids.add(el.dataset.blogId));
+    const url = `${document.body.dataset.viewerStateUrl}?blogs=${[...ids].join(",")}`;
+    fetch(url, { credentials: "same-origin" })
+      .then((res) => res.json())
+      .then(applyViewerState)
+      .catch(() => {});
+  }
+
   // Like form
   document.querySelectorAll(".like-form").forEach((form) => {
     form.addEventListener("submit", async function (e) {
@@ -87,6 +149,78 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   });
 
+  // One comment as rendered by blog_detail.html; data = {id, user, content, created_at}
+  function renderComment(data) {
+    const div = document.createElement("div");
+    div.className = "border rounded p-2 mb-2 comment-item";
+    div.id = "comment-" + data.id;
+    div.setAttribute("data-comment-id", data.id);
+    const header = document.createElement("div");
+    header.className = "d-flex justify-content-between";
+    const user = document.createElement("strong");
+    user.textContent = data.user;
+    const time = document.createElement("small");
+    time.className = "text-muted";
+    time.textContent = data.created_at;
+    header.append(user, time);
+    // textContent: comments are user input and must never be parsed as HTML
+    const content = document.createElement("div");
+    content.className = "comment-content";
+    content.textContent = data.content;
+    div.append(header, content);
+    // add delete button if current user is owner or blog author
+    const commentsList = document.getElementById("comments-list");
+    const currentUser = commentsList.dataset.currentUser || "";
+    const blogAuthor = commentsList.dataset.blogAuthor || "";
+    if (currentUser && (data.user === currentUser || blogAuthor === currentUser)) {
+      const delForm = document.createElement("form");
+      delForm.method = "post";
+      delForm.action = `/comment/${data.id}/delete/`;
+      delForm.className = "mt-1 delete-comment-form";
+      delForm.setAttribute("data-comment-id", data.id);
+      // CSRF token input
+      const csrfInput = document.createElement("input");
+      csrfInput.type = "hidden";
+      csrfInput.name = "csrfmiddlewaretoken";
+      csrfInput.value = getCSRFToken();
+      delForm.appendChild(csrfInput);
+      const btn = document.createElement("button");
+      btn.type = "submit";
+      btn.className = "btn btn-sm btn-outline-danger";
+      btn.textContent = "Delete";
+      delForm.appendChild(btn);
+      div.appendChild(delForm);
+    }
+    return div;
+  }
+
+  // Load more comments: keyset paged, older comments appended at the end
+  document.querySelectorAll(".load-more-comments").forEach((button) => {
+    button.addEventListener("click", async function () {
+      button.disabled = true;
+      const url = `${button.dataset.url}?cursor=${encodeURIComponent(button.dataset.cursor)}`;
+      try {
+        const res = await fetch(url, { credentials: "same-origin" });
+        const data = await res.json();
+        const commentsList = document.getElementById("comments-list");
+        data.comments.forEach((comment) => {
+          // Skip comments already shown (e.g. posted during this visit)
+          if (!document.getElementById("comment-" + comment.id)) {
+            commentsList.appendChild(renderComment(comment));
+          }
+        });
+        if (data.next_cursor) {
+          button.dataset.cursor = data.next_cursor;
+          button.disabled = false;
+        } else {
+          button.remove();
+        }
+      } catch (err) {
+        button.disabled = false;
+      }
+    });
+  });
+
   // Comment form
   document.querySelectorAll(".comment-form").forEach((form) => {
     form.addEventListener("submit", async function (e) {
@@ -99,36 +233,8 @@ document.addEventListener("DOMContentLoaded", function () {
         // remove 'No comments yet' placeholder if present
         const noComments = document.getElementById("no-comments");
         if (noComments) noComments.remove();
-        // create comment HTML
         const commentsList = document.getElementById("comments-list");
-        const div = document.createElement("div");
-        div.className = "border rounded p-2 mb-2 comment-item";
-        div.id = "comment-" + data.id;
-        div.setAttribute("data-comment-id", data.id);
-        div.innerHTML = `\n          <div class="d-flex justify-content-between">\n            <strong>${data.user}</strong>\n            <small class="text-muted">${data.created_at}</small>\n          </div>\n          <div class="comment-content">${data.content}</div>\n        `;
-        // add delete button if current user is owner or blog author
-        const currentUser = commentsList.dataset.currentUser || "";
-        const blogAuthor = commentsList.dataset.blogAuthor || "";
-        if (data.user === currentUser || blogAuthor === currentUser) {
-          const delForm = document.createElement("form");
-          delForm.method = "post";
-          delForm.action = `/comment/${data.id}/delete/`;
-          delForm.className = "mt-1 delete-comment-form";
-          delForm.setAttribute("data-comment-id", data.id);
-          // CSRF token input
-          const csrfInput = document.createElement("input");
-          csrfInput.type = "hidden";
-          csrfInput.name = "csrfmiddlewaretoken";
-          csrfInput.value = getCSRFToken();
-          delForm.appendChild(csrfInput);
-          const btn = document.createElement("button");
-          btn.type = "submit";
-          btn.className = "btn btn-sm btn-outline-danger";
-          btn.textContent = "Delete";
-          delForm.appendChild(btn);
-          div.appendChild(delForm);
-        }
-        commentsList.prepend(div);
+        commentsList.prepend(renderComment(data));
         // clear input
         form.querySelector('input[name="content"]').value = "";
         // attach delete handler if delete form exists inside (unlikely here)
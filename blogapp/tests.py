@@ -1,3 +1,847 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.http import HttpResponse
+from django.template import RequestContext, Template
+from django.db.models.functions import Lower
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .business_logic import set_like, toggle_like
+from .database_logic import COMMENT_PAGE_SIZE, LISTING_PAGE_SIZE
+from .models import Blog, Comment, Like, MediaBlob, OutboxEmail
+from .page_cache import cache_page_shell
+from .search import MAX_SEARCH_OFFSET, InMemoryIndex, SearchResults, get_search_backend
+from utils.common import DefaultImageRegistry, send_email_notification
+from utils.images import variant_name
+from utils.storage import blog_image_storage, is_hashed_name
+from utils.uploads import ImageUploadHandler
 
-# Create your tests here.
+
+class BlogCounterTests(TestCase):
+    """like_count / comment_count follow Like and Comment rows, cascades included."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('counter@example.com', 'counter@example.com', 'pw-for-counter-tests')
+        self.reader = User.objects.create_user('reader@example.com', 'reader@example.com', 'pw-for-counter-tests')
+        self.blog = Blog.objects.create(title='Counted', content='text', author=self.author, status='published')
+        self.other = Blog.objects.create(title='Elsewhere', content='text', author=self.reader, status='published')
+
+    def counts(self, blog):
+        blog.refresh_from_db()
+        return blog.like_count, blog.comment_count
+
+    def test_writes_and_deletes_move_counters(self):
+        like = Like.objects.create(blog=self.blog, user=self.reader)
+        Comment.objects.create(blog=self.blog, user=self.reader, content='hi')
+        self.assertEqual(self.counts(self.blog), (1, 1))
+        like.delete()
+        Comment.objects.filter(blog=self.blog).delete()
+        self.assertEqual(self.counts(self.blog), (0, 0))
+
+    def test_deleting_a_blog_skips_its_own_counter_updates(self):
+        for i in range(3):
+            user = User.objects.create_user(f'fan{i}@example.com', f'fan{i}@example.com', 'pw-for-counter-tests')
+            Like.objects.create(blog=self.blog, user=user)
+            Comment.objects.create(blog=self.blog, user=user, content='hi')
+        with CaptureQueriesContext(connection) as queries:
+            self.blog.delete()
+        self.assertEqual([q['sql'] for q in queries if q['sql'].startswith('UPDATE')], [])
+
+    def test_deleting_a_user_still_decrements_other_blogs(self):
+        Like.objects.create(blog=self.other, user=self.author)
+        Comment.objects.create(blog=self.other, user=self.author, content='hi')
+        Like.objects.create(blog=self.blog, user=self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            self.author.delete()
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        # One per counter on the surviving blog, none for the author's own blog
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.counts(self.other), (0, 0))
+
+
+class LikeServiceTests(TestCase):
+    """set_like / toggle_like: idempotent, counter in step, three statements per change."""
+
+    def setUp(self):
+        author = User.objects.create_user('liked@example.com', 'liked@example.com', 'pw-for-like-tests')
+        self.reader = User.objects.create_user('fan@example.com', 'fan@example.com', 'pw-for-like-tests')
+        self.blog = Blog.objects.create(title='Liked', content='text', author=author, status='published')
+
+    def statements(self, call, *args):
+        with CaptureQueriesContext(connection) as queries:
+            result = call(self.blog.pk, self.reader.pk, *args)
+        return result, [q['sql'].split()[0] for q in queries if 'SAVEPOINT' not in q['sql']]
+
+    def test_toggle(self):
+        result, statements = self.statements(toggle_like)
+        self.assertEqual(result, (True, 1))
+        self.assertEqual(statements, ['UPDATE', 'INSERT', 'UPDATE'])
+        result, statements = self.statements(toggle_like)
+        self.assertEqual(result, (False, 0))
+        self.assertEqual(statements, ['UPDATE', 'DELETE', 'UPDATE'])
+        self.assertFalse(Like.objects.exists())
+
+    def test_set_like_is_idempotent(self):
+        self.assertEqual(set_like(self.blog.pk, self.reader.pk, True), 1)
+        count, statements = self.statements(set_like, True)
+        self.assertEqual((count, len(statements)), (1, 1))
+        self.assertEqual(set_like(self.blog.pk, self.reader.pk, False), 0)
+        self.assertEqual(set_like(self.blog.pk, self.reader.pk, False), 0)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 0)
+
+    def test_missing_blog(self):
+        with self.assertRaises(Blog.DoesNotExist):
+            toggle_like(999999, self.reader.pk)
+
+
+class KeysetListingTests(TestCase):
+    """Card listings page on (created_at, id) and cost the same on every page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lister@example.com', 'lister@example.com', 'pw-for-listing-tests')
+        other = User.objects.create_user('other@example.com', 'other@example.com', 'pw-for-listing-tests')
+        Blog.objects.bulk_create(
+            Blog(title=f'Post {i}', content='text', author=cls.user if i % 2 else other,
+                 status='draft' if i % 5 == 0 else 'published')
+            for i in range(LISTING_PAGE_SIZE * 3)
+        )
+        # Equal timestamps: only the id tie-break keeps pages apart
+        Blog.objects.update(created_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, queries):
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, {'before': cursor} if cursor else {})
+            seen += [blog.pk for blog in response.context['blogs']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                return seen
+
+    def test_blog_list_walks_published_blogs_once(self):
+        expected = Blog.objects.filter(status='published').order_by('-created_at', '-id').values_list('pk', flat=True)
+        # Anonymous: the cards come from one query, no like lookup
+        self.assertEqual(self.walk('/blogs/', 1), list(expected))
+
+    def test_home_shell_pages_like_blog_list(self):
+        self.assertEqual(self.walk('/', 1), self.walk('/blogs/', 1))
+
+    def test_my_blogs_includes_drafts(self):
+        self.client.force_login(self.user)
+        expected = Blog.objects.filter(author=self.user).order_by('-created_at', '-id').values_list('pk', flat=True)
+        # User, cards and the page's liked ids; the session comes from the cache
+        self.assertEqual(self.walk('/my/', 3), list(expected))
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        first = self.client.get('/blogs/').context['blogs']
+        response = self.client.get('/blogs/', {'before': 'not-a-cursor'})
+        self.assertEqual([b.pk for b in response.context['blogs']], [b.pk for b in first])
+
+
+class RecordingEmailBackend(LocmemEmailBackend):
+    """Locmem backend that notes each row's stored status at send time."""
+    statuses = []
+
+    def send_messages(self, messages):
+        RecordingEmailBackend.statuses += list(OutboxEmail.objects.values_list('status', flat=True))
+        return super().send_messages(messages)
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('mail server down')
+
+
+class OutboxTests(TestCase):
+    """Queued mail is delivered by send_outbox outside any row lock and retried with backoff."""
+
+    def send_outbox(self, backend='django.core.mail.backends.locmem.EmailBackend', **options):
+        out, err = StringIO(), StringIO()
+        call_command('send_outbox', once=True, backend=backend, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_queued_email_is_sent_once(self):
+        self.assertTrue(send_email_notification('Hi', 'Body', 'to@example.com'))
+        self.assertEqual(mail.outbox, [])
+        out, _ = self.send_outbox()
+        self.assertIn('Processed 1 outbox email(s)', out)
+        self.assertEqual([m.to for m in mail.outbox], [['to@example.com']])
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.send_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rows_are_claimed_before_sending(self):
+        RecordingEmailBackend.statuses = []
+        send_email_notification('Hi', 'Body', 'to@example.com')
+        self.send_outbox(backend='blogapp.tests.RecordingEmailBackend')
+        self.assertEqual(RecordingEmailBackend.statuses, ['sending'])
+
+    def test_failure_is_retried_with_backoff_then_given_up(self):
+        send_email_notification('Hi', 'Body', 'to@example.com')
+        _, err = self.send_outbox(backend='blogapp.tests.FailingEmailBackend', backoff=60)
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('mail server down', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('retrying in 60s', err)
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.send_outbox(backend='blogapp.tests.FailingEmailBackend', max_attempts=2)
+        self.assertEqual(OutboxEmail.objects.get().status, 'failed')
+
+    def test_expired_lease_is_picked_up_again(self):
+        send_email_notification('Hi', 'Body', 'to@example.com')
+        # A worker claimed the row and died before finishing
+        OutboxEmail.objects.update(status='sending', attempts=1, next_attempt_at=timezone.now())
+        self.send_outbox()
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('sent', 2))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class DefaultImageRegistryTests(SimpleTestCase):
+    """Default images are listed from disk once and chosen by blog id."""
+    candidates = ['blog_images/a.jpg', 'blog_images/b.jpg', 'blog_images/c.jpg']
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.directory = os.path.join(media.name, 'blog_images')
+        os.mkdir(self.directory)
+        for name in ('a.jpg', 'c.jpg'):
+            open(os.path.join(self.directory, name), 'wb').close()
+
+    def test_choice_is_stable_and_skips_missing_files(self):
+        registry = DefaultImageRegistry(self.candidates)
+        self.assertEqual(registry.images(), ['blog_images/a.jpg', 'blog_images/c.jpg'])
+        self.assertEqual([registry.choose(pk) for pk in (4, 5, 4)], ['blog_images/a.jpg', 'blog_images/c.jpg', 'blog_images/a.jpg'])
+        self.assertEqual(registry.choose(), 'blog_images/a.jpg')
+
+    def test_steady_state_lookups_do_not_touch_the_disk(self):
+        registry = DefaultImageRegistry(self.candidates, recheck_interval=60)
+        registry.refresh(force=True)
+        with mock.patch('utils.common.os.stat') as stat, mock.patch('utils.common.os.listdir') as listdir:
+            for pk in range(100):
+                registry.choose(pk)
+        stat.assert_not_called()
+        listdir.assert_not_called()
+
+    def test_directory_changes_are_picked_up(self):
+        registry = DefaultImageRegistry(self.candidates, recheck_interval=0)
+        registry.refresh(force=True)
+        open(os.path.join(self.directory, 'b.jpg'), 'wb').close()
+        # Force a visible mtime change even on coarse-grained filesystems
+        os.utime(self.directory, (0, registry._mtime + 10))
+        self.assertEqual(len(registry.images()), 3)
+
+    def test_empty_directory_falls_back_to_first_candidate(self):
+        registry = DefaultImageRegistry(['blog_images/missing.jpg'])
+        self.assertEqual(registry.choose(7), 'blog_images/missing.jpg')
+
+
+def image_bytes(size=(800, 600), fmt='PNG', color='teal'):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class MediaRootMixin:
+    """Point MEDIA_ROOT at a throwaway directory for the test."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, IMAGE_VARIANTS_ASYNC=False))
+        self.media_root = media.name
+
+    def write_media(self, name, data):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return path
+
+
+class ImageVariantTests(MediaRootMixin, SimpleTestCase):
+    """/media/variants/ renders variants of real images only, once."""
+    source = 'images/ab/cd/abcd' + '0' * 60 + '.png'
+
+    def setUp(self):
+        super().setUp()
+        self.write_media(self.source, image_bytes())
+
+    def test_variant_is_rendered_and_stored(self):
+        from PIL import Image
+
+        response = self.client.get(f'/media/{variant_name(self.source, 320, "webp")}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(os.path.join(self.media_root, variant_name(self.source, 320, 'webp'))) as variant:
+            self.assertEqual(variant.size, (320, 240))
+        # No temp files left behind
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'variants/320/images/ab/cd')), [os.path.basename(variant_name(self.source, 320, 'webp'))])
+
+    def test_variants_of_variants_and_other_files_are_refused(self):
+        self.client.get(f'/media/{variant_name(self.source, 320, "jpeg")}')
+        nested = variant_name(variant_name(self.source, 320, 'jpeg'), 320, 'jpeg')
+        self.write_media('elsewhere/photo.png', image_bytes())
+        for url in (f'/media/{nested}', '/media/variants/320/elsewhere/photo.png.jpg',
+                    f'/media/variants/321/{self.source}.jpg',
+                    '/media/variants/320/images/ab/cd/../../../elsewhere/photo.png.jpg'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, nested)))
+
+    def test_corrupt_and_oversized_sources_are_404(self):
+        self.write_media(self.source, b'\x89PNG\r\n\x1a\n' + b'garbage' * 20)
+        self.assertEqual(self.client.get(f'/media/{variant_name(self.source, 320, "webp")}').status_code, 404)
+        self.write_media(self.source, image_bytes(size=(400, 400)))
+        # Over twice PIL's pixel limit raises DecompressionBombError, not an OSError
+        with mock.patch('PIL.Image.MAX_IMAGE_PIXELS', 1000):
+            response = self.client.get(f'/media/{variant_name(self.source, 640, "jpeg")}')
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+    """Identical uploads share one file; the last blog to let go removes it."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('cas@example.com', 'cas@example.com', 'pw-for-cas-tests')
+        self.png = image_bytes()
+
+    def upload(self, data=None, name='photo.PNG'):
+        return SimpleUploadedFile(name, data or self.png, content_type='image/png')
+
+    def blog(self, **kwargs):
+        return Blog.objects.create(title='Pic', content='text', author=self.user, image=self.upload(), **kwargs)
+
+    def refcount(self, name):
+        return MediaBlob.objects.filter(name=name).values_list('refcount', flat=True).first()
+
+    def test_identical_uploads_are_stored_once(self):
+        first, second = self.blog(), self.blog()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^images/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(len(os.listdir(os.path.dirname(first.image.path))), 1)
+        self.assertEqual(self.refcount(first.image.name), 2)
+
+    def test_extension_comes_from_the_content_not_the_filename(self):
+        for client_name in ('x.html', 'x.svg', 'noext'):
+            blog = Blog.objects.create(title='Pic', content='text', author=self.user, image=self.upload(name=client_name))
+            self.assertTrue(blog.image.name.endswith('.png'), blog.image.name)
+        gif = Blog.objects.create(title='Pic', content='text', author=self.user, image=self.upload(image_bytes(fmt='GIF'), 'x.png'))
+        self.assertTrue(gif.image.name.endswith('.gif'))
+
+    def test_non_images_are_refused(self):
+        with self.assertRaises(SuspiciousFileOperation):
+            blog_image_storage.save('x.png', self.upload(b'<html><script>alert(1)</script></html>'))
+        digest = 'abcd' + '0' * 60
+        self.assertTrue(is_hashed_name(f'images/ab/cd/{digest}.webp'))
+        for ext in ('html', 'svg', 'PNG', ''):
+            self.assertFalse(is_hashed_name(f'images/ab/cd/{digest}.{ext}'))
+
+    def test_upload_race_past_exists_does_not_hang(self):
+        name = self.blog().image.name
+        # Both uploads passed exists() before either wrote the file
+        with mock.patch.object(blog_image_storage, 'exists', return_value=False):
+            again = self.blog()
+        self.assertEqual(again.image.name, name)
+        self.assertEqual(self.refcount(name), 2)
+
+    def test_refcounts_drop_and_last_release_deletes_the_file(self):
+        first, second = self.blog(), self.blog()
+        name, path = first.image.name, first.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.refcount(name))
+        self.assertFalse(os.path.exists(path))
+
+    def test_instances_loaded_without_the_image_column_still_release(self):
+        replaced, deleted = self.blog(), self.blog()
+        name = replaced.image.name
+        blog = Blog.objects.defer('image').get(pk=replaced.pk)
+        blog.image = self.upload(image_bytes(color='red'))
+        blog.save()
+        self.assertEqual(self.refcount(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.objects.only('id', 'title').get(pk=deleted.pk).delete()
+        self.assertIsNone(self.refcount(name))
+
+    def test_migrate_media_to_cas(self):
+        self.write_media('uploads/legacy.png', self.png)
+        blogs = [Blog.objects.create(title='Old', content='text', author=self.user) for _ in range(2)]
+        Blog.objects.filter(pk__in=[b.pk for b in blogs]).update(image='uploads/legacy.png')
+        out = StringIO()
+        call_command('migrate_media_to_cas', stdout=out)
+        self.assertIn('Moved 1 file(s); 0 missing.', out.getvalue())
+        names = set(Blog.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(self.refcount(name), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads/legacy.png')))
+        # A fresh upload of the same bytes joins the migrated file
+        self.assertEqual(self.blog().image.name, name)
+        self.assertEqual(self.refcount(name), 3)
+
+    def test_migrate_media_to_cas_skips_non_images(self):
+        self.write_media('uploads/page.png', b'<html></html>')
+        blog = Blog.objects.create(title='Old', content='text', author=self.user)
+        Blog.objects.filter(pk=blog.pk).update(image='uploads/page.png')
+        err = StringIO()
+        call_command('migrate_media_to_cas', stdout=StringIO(), stderr=err)
+        self.assertIn('Not an image, skipped: uploads/page.png', err.getvalue())
+        self.assertEqual(Blog.objects.get(pk=blog.pk).image.name, 'uploads/page.png')
+        self.assertFalse(MediaBlob.objects.exists())
+
+
+class ImageUploadTests(MediaRootMixin, TestCase):
+    """Image views stream uploads through ImageUploadHandler; the rest of the site doesn't."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='uploader', password='pass12345')
+        self.client.force_login(self.user)
+
+    def post_image(self, name, data, content_type='image/png'):
+        upload = SimpleUploadedFile(name, data, content_type=content_type)
+        return self.client.post('/create/', {'title': 'Upload', 'content': 'text', 'action': 'save_draft', 'image': upload})
+
+    def test_valid_image_is_stored_by_content(self):
+        response = self.post_image('photo.png', image_bytes((64, 64)))
+        self.assertRedirects(response, '/my/', fetch_redirect_response=False)
+        self.assertRegex(Blog.objects.get().image.name, r'^images/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+
+    def test_corrupt_body_behind_valid_header_is_rejected(self):
+        data = image_bytes((64, 64))
+        response = self.post_image('broken.png', data[:40] + b'\0' * (len(data) - 40))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Invalid image file')
+        self.assertFalse(Blog.objects.exists())
+
+    def test_non_image_is_rejected(self):
+        response = self.post_image('notes.txt', b'just some text', content_type='text/plain')
+        self.assertContains(response, 'Invalid image file')
+        self.assertFalse(Blog.objects.exists())
+
+    def test_csrf_still_enforced(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post('/create/', {'title': 'Upload', 'content': 'text'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_views_keep_default_handlers(self):
+        request = RequestFactory().post('/')
+        self.assertFalse(any(isinstance(handler, ImageUploadHandler) for handler in request.upload_handlers))
+
+
+class PageCacheTests(TestCase):
+    """Shell pages are served from the cache until a change they show bumps a generation."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='cached', password='pass12345')
+        self.reader = User.objects.create_user(username='cache-reader', password='pass12345')
+        self.blog = Blog.objects.create(author=self.author, title='Cached', content='text', status='published')
+        self.other = Blog.objects.create(author=self.author, title='Other', content='text', status='published')
+        self.detail = f'/blog/{self.blog.pk}/'
+
+    def cache_state(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Page-Cache']
+
+    def warm(self, *paths):
+        for path in paths:
+            self.cache_state(path)
+            self.assertEqual(self.cache_state(path), 'hit')
+
+    def test_hit_serves_same_html_without_queries(self):
+        first = self.client.get('/')
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get('/')
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        # The shell is viewer independent: a logged-in reader gets the same copy
+        self.client.force_login(self.reader)
+        self.assertEqual(self.cache_state('/'), 'hit')
+
+    def test_query_string_is_part_of_the_key(self):
+        self.warm('/')
+        self.assertEqual(self.cache_state('/?before=x'), 'miss')
+
+    def test_blog_save_invalidates_listing_and_detail(self):
+        self.warm('/', self.detail, f'/blog/{self.other.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.title = 'Renamed'
+            self.blog.save()
+        self.assertEqual(self.cache_state('/'), 'miss')
+        self.assertEqual(self.cache_state(self.detail), 'miss')
+        self.assertEqual(self.cache_state(f'/blog/{self.other.pk}/'), 'hit')
+
+    def test_like_invalidates_listing_and_detail(self):
+        self.warm('/', self.detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(blog=self.blog, user=self.reader)
+        self.assertEqual(self.cache_state('/'), 'miss')
+        self.assertEqual(self.cache_state(self.detail), 'miss')
+
+    def test_comment_invalidates_only_its_detail_page(self):
+        self.warm('/', self.detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(blog=self.blog, user=self.reader, content='Nice')
+        self.assertEqual(self.cache_state('/'), 'hit')
+        self.assertEqual(self.cache_state(self.detail), 'miss')
+
+    def test_rolled_back_change_keeps_the_cache(self):
+        self.warm('/')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.blog.save()
+        self.assertTrue(callbacks)
+        self.assertEqual(self.cache_state('/'), 'hit')
+
+    def test_cached_shells_carry_no_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        for path in ('/', self.detail):
+            self.assertEqual(client.get(path)['X-Page-Cache'], 'miss')
+            secret = client.cookies['csrftoken'].value
+            response = self.client.get(path)
+            self.assertEqual(response['X-Page-Cache'], 'hit')
+            html = response.content.decode()
+            self.assertIn('name="csrfmiddlewaretoken"', html)
+            self.assertEqual(set(re.findall(r'name="csrfmiddlewaretoken" value="([^"]*)"', html)), {''})
+            self.assertNotIn(secret, html)
+            # Every viewer still gets a cookie for the JS to post with
+            self.assertIn('csrftoken', response.cookies)
+
+    def test_pages_that_render_a_token_are_not_cached(self):
+        @cache_page_shell(lambda: ['pagecache:gen:test'])
+        def view(request):
+            return HttpResponse(Template('{% csrf_token %}').render(RequestContext(request)))
+
+        for _ in range(2):
+            response = view(RequestFactory().get('/token/'))
+            self.assertIn(b'csrfmiddlewaretoken', response.content)
+            self.assertNotIn('X-Page-Cache', response)
+
+    def test_error_pages_are_not_cached(self):
+        response = self.client.get('/blog/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('X-Page-Cache', self.client.get('/blog/999999/'))
+
+
+class LikedStateTests(TestCase):
+    """Which cards the viewer liked comes from one query per page, not one per card."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='liked-author', password='pass12345')
+        cls.reader = User.objects.create_user(username='liked-reader', password='pass12345')
+        cls.blogs = [
+            Blog.objects.create(author=cls.author, title=f'Card {i}', content='text', status='published')
+            for i in range(LISTING_PAGE_SIZE)
+        ]
+        for blog in cls.blogs[::3]:
+            Like.objects.create(blog=blog, user=cls.reader)
+        cls.liked = {blog.pk for blog in cls.blogs[::3]}
+
+    def like_queries(self, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, data)
+        table = Like._meta.db_table
+        return response, [q['sql'] for q in queries if table in q['sql']]
+
+    def test_listing(self):
+        self.client.force_login(self.reader)
+        response, queries = self.like_queries('/blogs/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['liked_ids'], self.liked)
+
+    def test_anonymous_listing_skips_the_query(self):
+        response, queries = self.like_queries('/blogs/')
+        self.assertEqual((queries, response.context['liked_ids']), ([], set()))
+
+    def test_viewer_state(self):
+        self.client.force_login(self.reader)
+        response, queries = self.like_queries('/viewer-state/', {'blogs': ','.join(str(blog.pk) for blog in self.blogs)})
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.json()['liked'], sorted(self.liked))
+
+
+class SearchTests(TestCase):
+    """Ranked search pages and the signal hooks that keep the index current."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='searcher', password='pass12345')
+
+    def blog(self, title, content='text', status='published'):
+        return Blog.objects.create(author=self.author, title=title, content=content, status=status)
+
+    def titles(self, query):
+        return [blog.title for blog in SearchResults(query, Blog.objects.all())[0:50]]
+
+    def test_title_matches_rank_first_and_drafts_are_hidden(self):
+        self.blog('Gardening notes', content='all about tomatoes')
+        self.blog('Tomatoes', content='growing them')
+        self.blog('Tomatoes draft', status='draft')
+        response = self.client.get('/search/', {'q': 'TOMATOES'})
+        self.assertEqual([blog.title for blog in response.context['blogs']], ['Tomatoes', 'Gardening notes'])
+
+    def test_every_term_must_match(self):
+        self.blog('Red tomatoes')
+        self.blog('Green tomatoes')
+        self.assertEqual(self.titles('red tomatoes'), ['Red tomatoes'])
+        self.assertEqual(self.titles('   '), [])
+
+    def test_pages(self):
+        for i in range(LISTING_PAGE_SIZE + 1):
+            self.blog(f'Match {i}')
+        first = self.client.get('/search/', {'q': 'match'}).context
+        self.assertEqual((len(first['blogs']), first['next_search_page'], first['previous_search_page']), (LISTING_PAGE_SIZE, 2, None))
+        second = self.client.get('/search/', {'q': 'match', 'page': 2}).context
+        self.assertEqual((len(second['blogs']), second['next_search_page'], second['previous_search_page']), (1, None, 1))
+        self.assertEqual(self.client.get('/search/', {'q': 'match', 'page': 'x'}).context['previous_search_page'], None)
+
+    def test_out_of_range_page_is_not_found(self):
+        self.blog('Match')
+        last = MAX_SEARCH_OFFSET // LISTING_PAGE_SIZE + 1
+        self.assertEqual(self.client.get('/search/', {'q': 'match', 'page': last}).status_code, 200)
+        for page in (last + 1, 10 ** 30):
+            self.assertEqual(self.client.get('/search/', {'q': 'match', 'page': page}).status_code, 404)
+
+    def test_index_follows_saves_and_deletes(self):
+        blog = self.blog('Original title')
+        self.assertEqual(self.titles('original'), ['Original title'])
+        blog.title = 'Renamed title'
+        blog.save()
+        self.assertEqual((self.titles('original'), self.titles('renamed')), ([], ['Renamed title']))
+        blog.status = 'draft'
+        blog.save()
+        self.assertEqual(self.titles('renamed'), [])
+        blog.status = 'published'
+        blog.save()
+        self.assertEqual(self.titles('renamed'), ['Renamed title'])
+        blog.delete()
+        self.assertEqual(self.titles('renamed'), [])
+
+    def test_counter_saves_skip_the_index(self):
+        blog = self.blog('Counted')
+        with mock.patch.object(get_search_backend(), 'index_blog') as index_blog:
+            blog.save(update_fields=['like_count'])
+            index_blog.assert_not_called()
+            blog.save(update_fields=['title', 'updated_at'])
+            index_blog.assert_called_once_with(blog)
+
+    def test_in_memory_index_applies_changes_after_commit(self):
+        index = InMemoryIndex()
+        blog = self.blog('Memory match')
+        self.assertEqual([hit[0] for hit in index.search(['memory'], 0, 10)], [blog.pk])
+        blog.status = 'draft'
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            index.index_blog(blog)
+        self.assertEqual(len(index.search(['memory'], 0, 10)), 1)
+        callbacks[0]()
+        self.assertEqual(index.search(['memory'], 0, 10), [])
+
+
+class BlogSummaryTests(TestCase):
+    """excerpt / word_count / reading_time follow content without listings reading it."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('summary@example.com', 'summary@example.com', 'pw-for-summary-tests')
+
+    def test_save_keeps_summary_in_step(self):
+        blog = Blog.objects.create(title='Long', content='word ' * 450, author=self.user, status='published')
+        self.assertEqual(blog.word_count, 450)
+        self.assertEqual(blog.reading_time, 3)
+        self.assertTrue(blog.excerpt.endswith('...'))
+        blog.content = 'Short now'
+        blog.save(update_fields=['content'])
+        blog.refresh_from_db()
+        self.assertEqual((blog.excerpt, blog.word_count, blog.reading_time), ('Short now', 2, 1))
+
+    def test_backfill_command(self):
+        blogs = [Blog.objects.create(title=f'Post {i}', content=f'one two {i}', author=self.user) for i in range(5)]
+        # Rows written before the fields existed
+        Blog.objects.update(excerpt='', word_count=0, reading_time=1)
+        out = StringIO()
+        call_command('backfill_blog_summaries', batch_size=2, stdout=out)
+        self.assertIn('5 blog(s) updated', out.getvalue())
+        self.assertEqual(
+            list(Blog.objects.order_by('pk').values_list('excerpt', 'word_count')),
+            [(blog.content, 3) for blog in blogs],
+        )
+        call_command('backfill_blog_summaries', stdout=out)
+        self.assertIn('0 blog(s) updated', out.getvalue())
+
+
+class CommentStreamTests(TestCase):
+    """blog_detail shows the newest comments; the rest are keyset paged JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stream@example.com', 'stream@example.com', 'pw-for-stream-tests')
+        cls.blog = Blog.objects.create(title='Viral', content='text', author=cls.user, status='published')
+        Comment.objects.bulk_create(
+            Comment(blog=cls.blog, user=cls.user, content=f'comment {i}') for i in range(COMMENT_PAGE_SIZE * 2 + 5)
+        )
+        Blog.objects.filter(pk=cls.blog.pk).update(comment_count=COMMENT_PAGE_SIZE * 2 + 5)
+
+    def setUp(self):
+        # Rendered pages are cached (blogapp/page_cache.py); start each test cold
+        cache.clear()
+
+    def test_detail_cost_does_not_grow_with_comments(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/blog/{self.blog.pk}/')
+        self.assertContains(response, 'comment-item', count=COMMENT_PAGE_SIZE)
+        self.assertContains(response, f'Comments ({COMMENT_PAGE_SIZE * 2 + 5})')
+        self.assertContains(response, 'load-more-comments')
+
+    def test_load_more_walks_every_comment_once(self):
+        response = self.client.get(f'/blog/{self.blog.pk}/')
+        seen = re.findall(r'data-comment-id="(\d+)"\s*>', response.content.decode())
+        cursor = re.search(r'data-cursor="([^"]+)"', response.content.decode()).group(1)
+        while cursor:
+            data = self.client.get(f'/blog/{self.blog.pk}/comments/', {'cursor': cursor}).json()
+            seen += [str(comment['id']) for comment in data['comments']]
+            cursor = data['next_cursor']
+        expected = Comment.objects.filter(blog=self.blog).order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the hot query shapes and fail if any of them reads a whole table.
+
+    Only SQLite and MySQL are checked, matching the backends we deploy on.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('plan@example.com', 'plan@example.com', 'pw-for-plan-tests')
+        other = User.objects.create_user('other@example.com', 'other@example.com', 'pw-for-plan-tests')
+        for i in range(40):
+            blog = Blog.objects.create(
+                title=f'Post {i}', content='text', author=cls.user if i % 2 else other,
+                status='published' if i % 3 else 'draft',
+            )
+            Comment.objects.create(blog=blog, user=other, content='hi')
+        cls.blog = blog
+
+    def hot_queries(self):
+        email = 'Plan@Example.com'
+        return {
+            'blogs by status': Blog.objects.filter(status='published').order_by('-created_at', '-id'),
+            'blogs by author': Blog.objects.filter(author=self.user).order_by('-created_at', '-id'),
+            'comments by blog': Comment.objects.filter(blog=self.blog).order_by('created_at', 'id'),
+            'user by email': User.objects.filter(email=email),
+            'user by email or username (case-insensitive)': (
+                User.objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+                .filter(Q(email_lower=email.lower()) | Q(username_lower=email.lower()))
+            ),
+        }
+
+    def full_scans(self, queryset):
+        # Returns the plan lines (or JSON fragments) that read an entire table
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            return [line for line in plan.splitlines() if re.search(r'\bSCAN\b', line)
+                    and 'USING INDEX' not in line and 'USING COVERING INDEX' not in line
+                    and 'TEMP B-TREE' not in line], plan
+        plan = queryset.explain(format='JSON')
+        scans = [
+            block for block in json.dumps(json.loads(plan)).split('"table":')
+            if '"access_type": "ALL"' in block
+        ]
+        return scans, plan
+
+    @skipUnless(connection.vendor in ('sqlite', 'mysql'), 'EXPLAIN parsing covers SQLite and MySQL only')
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                scans, plan = self.full_scans(queryset)
+                self.assertEqual(scans, [], f"{name} falls back to a full scan:\n{plan}")
+
+
+class LikeConcurrencyTests(TransactionTestCase):
+    """Hammer the like service from many threads and check nothing drifts."""
+    users = 6
+    threads_per_user = 3
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('threads need a database file (or server) they can all connect to')
+        author = User.objects.create_user('author@example.com', 'author@example.com', 'pw-for-like-tests')
+        self.blog = Blog.objects.create(title='Liked', content='text', author=author, status='published')
+        self.likers = [
+            User.objects.create_user(f'liker{i}@example.com', f'liker{i}@example.com', 'pw-for-like-tests')
+            for i in range(self.users)
+        ]
+
+    def test_concurrent_likes_never_error_and_keep_count(self):
+        barrier = threading.Barrier(self.users * self.threads_per_user)
+        errors = []
+
+        def click(user, keep_liked):
+            # Double likes/unlikes mimic double clicks; each thread's last
+            # operation decides the final state, whatever the interleaving
+            try:
+                barrier.wait()
+                for _ in range(3):
+                    set_like(self.blog.pk, user.pk, True)
+                    set_like(self.blog.pk, user.pk, True)
+                    toggle_like(self.blog.pk, user.pk)
+                    toggle_like(self.blog.pk, user.pk)
+                    set_like(self.blog.pk, user.pk, False)
+                set_like(self.blog.pk, user.pk, keep_liked)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=click, args=(user, index % 2 == 0))
+            for index, user in enumerate(self.likers)
+            for _ in range(self.threads_per_user)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        liked_by = set(Like.objects.filter(blog=self.blog).values_list('user_id', flat=True))
+        self.assertEqual(liked_by, {user.pk for index, user in enumerate(self.likers) if index % 2 == 0})
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, len(liked_by))
@@ -13,9 +13,14 @@ urlpatterns = [
     path('blog/<int:blog_id>/publish/', views.publish_blog, name='publish_blog'),
     path('blog/<int:blog_id>/like/', views.toggle_like, name='toggle_like'),
     path('blog/<int:blog_id>/comment/', views.add_comment, name='add_comment'),
+    path('blog/<int:blog_id>/comments/', views.blog_comments, name='blog_comments'),
     path('comment/<int:comment_id>/delete/', views.delete_comment, name='delete_comment'),
     path('blogs/', views.blog_list, name='blog_list'),
     path('my/', views.my_blogs, name='my_blogs'),
+    path('search/', views.search, name='search'),
+    path('viewer-state/', views.viewer_state, name='viewer_state'),
+    # Lazily generated image variants (see utils/images.py); matches MEDIA_URL + 'variants/'
+    path('media/variants/<int:width>/<path:name>', views.image_variant, name='image_variant'),
 
 ]
 
@@ -1,23 +1,64 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import os
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages 
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
+from django.conf import settings
+from django.utils._os import safe_join
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils import dateformat, timezone
+from django.views.decorators.cache import never_cache
 from .models import Blog, Like, Comment
 from .forms import BlogForm
+from . import business_logic
+from .database_logic import (
+    COMMENT_PAGE_SIZE, LISTING_PAGE_SIZE, akeyset_page, blog_listing, comment_stream, keyset_page, liked_blog_ids,
+)
+from .search import MAX_SEARCH_OFFSET, SearchResults
+from .page_cache import cache_page_shell, LIST_GENERATION_KEY, blog_generation_key
+from utils.uploads import image_uploads, upload_rejection
+from utils.images import VARIANT_WIDTHS, variant_name, source_name, render_variant
 from utils.common import get_default_blog_image, validate_image_file, send_email_notification, get_user_display_name
 
+def _render_cards(request, blogs, next_cursor, context):
+    # Shared by home, blog_list and my_blogs: one page of cards, keyset paged
+    context.update({
+        'blogs': blogs,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('before'),
+    })
+    if not context.get('page_shell'):
+        # Shells get like state from viewer_state instead
+        context['liked_ids'] = liked_blog_ids(request.user, [blog.pk for blog in blogs])
+    return render(request, 'blogapp/home.html', context)
+
+
+def _render_listing(request, queryset, context):
+    blogs, next_cursor = keyset_page(queryset, request.GET.get('before'))
+    return _render_cards(request, blogs, next_cursor, context)
+
+
 # Home page (show only published blogs)
-def home(request):
-    blogs = Blog.objects.filter(status='published').order_by('-created_at')
-    return render(request, 'blogapp/home.html', {'blogs': blogs, 'page_title': 'All Blogs'})
+# Rendered as a viewer-independent shell so one cached copy serves everyone.
+# Async so ASGI workers don't park a thread per request; rows are fetched
+# with async iteration and everything the template reads is already loaded.
+@cache_page_shell(lambda: [LIST_GENERATION_KEY])
+async def home(request):
+    blogs, next_cursor = await akeyset_page(blog_listing(status='published'), request.GET.get('before'))
+    return _render_cards(request, blogs, next_cursor, {
+        'page_title': 'All Blogs',
+        'page_shell': True,
+    })
 
 
 
 # Create Blog (only logged-in users)
 @login_required(login_url='login')
+@image_uploads
 def create_blog(request):
     if request.method == "POST":
         title = request.POST['title']
@@ -25,35 +66,38 @@ def create_blog(request):
         image = request.FILES.get('image')
         action = request.POST.get('action')  # 'publish' or 'save_draft'
         
-        # Validate image if provided
-        if image and not validate_image_file(image):
+        # Validate image if provided (rejected uploads never reach request.FILES)
+        if upload_rejection(request, 'image') or (image and not validate_image_file(image)):
             messages.error(request, "Invalid image file. Please upload a valid image (JPEG, PNG, GIF, WebP) under 5MB.")
             return render(request, 'blogapp/create_blog.html')
         
         # Determine status based on button clicked
         status = 'published' if action == 'publish' else 'draft'
         
-        # Create blog - the model will handle default image assignment
-        blog = Blog.objects.create(
-            title=title, 
-            content=content, 
-            image=image,  # Will be None if no image provided, model will set default
-            author=request.user,
-            status=status
-        )
-        
-        # Send notification email for published blogs
-        if status == 'published':
-            user_name = get_user_display_name(request.user)
-            email_subject = "Blog Published Successfully!"
-            email_message = f"Hi {user_name},\n\nYour blog '{title}' has been published successfully!\n\nYou can view it on the home page.\n\nHappy Blogging!"
-            
-            send_email_notification(
-                subject=email_subject,
-                message=email_message,
-                recipient_email=request.user.email
+        # Create blog and queue its notification in one transaction
+        with transaction.atomic():
+            # Blogs without an upload get a default image at render time
+            blog = Blog.objects.create(
+                title=title, 
+                content=content, 
+                image=image,  # Will be None if no image provided
+                author=request.user,
+                status=status
             )
             
+            # Send notification email for published blogs
+            if status == 'published':
+                user_name = get_user_display_name(request.user)
+                email_subject = "Blog Published Successfully!"
+                email_message = f"Hi {user_name},\n\nYour blog '{title}' has been published successfully!\n\nYou can view it on the home page.\n\nHappy Blogging!"
+                
+                send_email_notification(
+                    subject=email_subject,
+                    message=email_message,
+                    recipient_email=request.user.email
+                )
+        
+        if status == 'published':
             messages.success(request, "Blog published successfully!")
             return redirect('home')
         else:
@@ -62,49 +106,110 @@ def create_blog(request):
 
     return render(request, 'blogapp/create_blog.html')
 
-def blog_detail(request, id):
-    blog = get_object_or_404(Blog, id=id)
-    is_liked = False
-    if request.user.is_authenticated:
-        is_liked = Like.objects.filter(blog=blog, user=request.user).exists()
-    comments = Comment.objects.filter(blog=blog).order_by('-created_at')
-    like_count = blog.likes.count()
+# Cached, async shell like home; like state and owner controls come from viewer_state
+@cache_page_shell(lambda id: [blog_generation_key(id)])
+async def blog_detail(request, id):
+    blog = await aget_object_or_404(Blog.objects.select_related('author'), id=id)
+    # Newest comments only; the rest come from blog_comments on "load more".
+    # The heading uses the stored comment_count, so page cost stays flat.
+    comments, next_cursor = await akeyset_page(comment_stream(blog.id), page_size=COMMENT_PAGE_SIZE)
     return render(request, 'blogapp/blog_detail.html', {
         'blog': blog,
-        'is_liked': is_liked,
-        'like_count': like_count,
+        'like_count': blog.like_count,
         'comments': comments,
+        'next_cursor': next_cursor,
+        'page_shell': True,
     })
 
+
+def _comment_json(comment):
+    return {
+        'id': comment.id,
+        'user': comment.user.username,
+        'content': comment.content,
+        # Same format and timezone as the template's |date:"d M Y H:i"
+        'created_at': dateformat.format(timezone.localtime(comment.created_at), 'd M Y H:i'),
+    }
+
+
+async def blog_comments(request, blog_id):
+    """
+    "Load more" for blog_detail: the next page of comments after ?cursor=,
+    as JSON, with the cursor for the page after that (null at the end).
+    """
+    comments, next_cursor = await akeyset_page(
+        comment_stream(blog_id), request.GET.get('cursor'), page_size=COMMENT_PAGE_SIZE,
+    )
+    return JsonResponse({
+        'comments': [_comment_json(comment) for comment in comments],
+        'next_cursor': next_cursor,
+    })
+
+
+@never_cache
+def viewer_state(request):
+    """
+    Per-viewer bits of the cached page shells: who is logged in, which of the
+    given blogs (?blogs=1,2,3) they liked, and any pending flash messages.
+    """
+    blog_ids = [int(b) for b in request.GET.get('blogs', '').split(',')[:100] if b.isdigit()]
+    user = request.user
+    data = {
+        'authenticated': user.is_authenticated,
+        'username': user.username if user.is_authenticated else '',
+        'first_name': user.first_name if user.is_authenticated else '',
+        'liked': sorted(liked_blog_ids(user, blog_ids)),
+        'messages': [{'tags': m.tags, 'message': str(m)} for m in messages.get_messages(request)],
+    }
+    return JsonResponse(data)
+
 def blog_list(request):
-    blogs = Blog.objects.filter(status='published').order_by('-created_at')
-    return render(request, 'blogapp/home.html', {'blogs': blogs, 'page_title': 'All Blogs'})
+    return _render_listing(request, blog_listing(status='published'), {'page_title': 'All Blogs'})
+
+def search(request):
+    # Ranked full-text results, page-numbered (see blogapp/search.py)
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    start = (page - 1) * LISTING_PAGE_SIZE
+    if start > MAX_SEARCH_OFFSET:
+        raise Http404("No such results page")
+    blogs = SearchResults(query, blog_listing(status='published'))[start:start + LISTING_PAGE_SIZE + 1]
+    return render(request, 'blogapp/home.html', {
+        'page_title': 'Search',
+        'blogs': blogs[:LISTING_PAGE_SIZE],
+        'liked_ids': liked_blog_ids(request.user, [blog.pk for blog in blogs[:LISTING_PAGE_SIZE]]),
+        'search_query': query,
+        'is_first_page': True,
+        'next_search_page': page + 1 if len(blogs) > LISTING_PAGE_SIZE else None,
+        'previous_search_page': page - 1 if page > 1 else None,
+    })
 
 @login_required
 def my_blogs(request):
     # Show all user's blogs (both draft and published) in My Blogs
-    user_blogs = Blog.objects.filter(author=request.user).order_by('-created_at')
-    return render(request, 'blogapp/home.html', {
-        'blogs': user_blogs,
+    return _render_listing(request, blog_listing(author=request.user), {
         'page_title': 'My Blogs',
         'showing_my_blogs': True,
     })
 
 @login_required
 def toggle_like(request, blog_id):
-    blog = get_object_or_404(Blog, id=blog_id)
-    like, created = Like.objects.get_or_create(blog=blog, user=request.user)
-    if not created:
-        like.delete()
-        messages.info(request, "You unliked this blog.")
-        liked = False
-    else:
+    # Race-free toggle; the new count comes back from the service, no re-count
+    try:
+        liked, like_count = business_logic.toggle_like(blog_id, request.user.pk)
+    except Blog.DoesNotExist:
+        raise Http404("Blog not found")
+    if liked:
         messages.success(request, "You liked this blog.")
-        liked = True
+    else:
+        messages.info(request, "You unliked this blog.")
     # If AJAX request, return JSON so frontend can update without reload
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return JsonResponse({'liked': liked, 'like_count': blog.likes.count()})
-    return redirect('blog_detail', blog.id)
+        return JsonResponse({'liked': liked, 'like_count': like_count})
+    return redirect('blog_detail', blog_id)
 
 @login_required
 def add_comment(request, blog_id):
@@ -120,12 +225,7 @@ def add_comment(request, blog_id):
         messages.success(request, "Comment added.")
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             # return minimal data to render on client
-            return JsonResponse({
-                'id': comment.id,
-                'user': comment.user.username,
-                'content': comment.content,
-                'created_at': comment.created_at.strftime('%d %b %Y %H:%M'),
-            })
+            return JsonResponse(_comment_json(comment))
     return redirect('blog_detail', blog.id)
 
 @login_required
@@ -142,6 +242,7 @@ def delete_comment(request, comment_id):
     return redirect('blog_detail', blog_id)
 
 @login_required
+@image_uploads
 def blog_edit(request, blog_id):
     blog = get_object_or_404(Blog, id=blog_id)
     if request.user != blog.author:
@@ -152,7 +253,7 @@ def blog_edit(request, blog_id):
         
         # Validate image if provided
         new_image = request.FILES.get('image')
-        if new_image and not validate_image_file(new_image):
+        if upload_rejection(request, 'image') or (new_image and not validate_image_file(new_image)):
             messages.error(request, "Invalid image file. Please upload a valid image (JPEG, PNG, GIF, WebP) under 5MB.")
             return render(request, 'blogapp/blog_edit.html', {'form': form, 'blog': blog})
         
@@ -162,20 +263,21 @@ def blog_edit(request, blog_id):
             was_published = blog.status == 'published'
             
             if action == 'publish':
-                blog.status = 'published'
-                blog.save()
-                
-                # Send notification email if newly published
-                if not was_published:
-                    user_name = get_user_display_name(request.user)
-                    email_subject = "Blog Published Successfully!"
-                    email_message = f"Hi {user_name},\n\nYour blog '{blog.title}' has been published successfully!\n\nYou can view it on the home page.\n\nHappy Blogging!"
+                with transaction.atomic():
+                    blog.status = 'published'
+                    blog.save()
                     
-                    send_email_notification(
-                        subject=email_subject,
-                        message=email_message,
-                        recipient_email=request.user.email
-                    )
+                    # Send notification email if newly published
+                    if not was_published:
+                        user_name = get_user_display_name(request.user)
+                        email_subject = "Blog Published Successfully!"
+                        email_message = f"Hi {user_name},\n\nYour blog '{blog.title}' has been published successfully!\n\nYou can view it on the home page.\n\nHappy Blogging!"
+                        
+                        send_email_notification(
+                            subject=email_subject,
+                            message=email_message,
+                            recipient_email=request.user.email
+                        )
                 
                 messages.success(request, "Blog published successfully!")
                 return redirect('home')
@@ -227,4 +329,34 @@ def publish_blog(request, blog_id):
     next_url = request.GET.get('next')
     if next_url:
         return redirect(next_url)
-    return redirect('blog_detail', blog.id)
\ No newline at end of file
+    return redirect('blog_detail', blog.id)
+
+
+def image_variant(request, width, name):
+    """
+    Serve a resized image variant, generating it on first request.
+    In production the web server serves MEDIA_ROOT directly and only falls
+    through to this view when the variant file does not exist yet.
+    """
+    source, fmt = source_name(name)
+    if width not in VARIANT_WIDTHS or not source:
+        raise Http404("Unknown image variant")
+    try:
+        source_path = safe_join(settings.MEDIA_ROOT, source)
+        dest_path = safe_join(settings.MEDIA_ROOT, variant_name(source, width, fmt))
+    except SuspiciousFileOperation:
+        raise Http404("Unknown image variant")
+
+    if not os.path.exists(dest_path):
+        if not os.path.exists(source_path):
+            raise Http404("Image not found")
+        try:
+            render_variant(source_path, dest_path, width, fmt)
+        except OSError:
+            # Unreadable or non-image source
+            raise Http404("Image not found")
+
+    response = FileResponse(open(dest_path, 'rb'), content_type=f'image/{fmt}')
+    # Variant names change whenever the source does, so they can be cached for good
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
\ No newline at end of file
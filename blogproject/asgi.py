@@ -3,6 +3,13 @@ ASGI config for blogproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The read paths (home, blog_detail and the BlogList / BlogDetail GET /
+CommentsList API views) are async views, so under an ASGI server, e.g.
+
+    uvicorn blogproject.asgi:application
+
+they run on the event loop instead of a thread per request.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,85 @@
+"""
+Session engine (SESSION_ENGINE = 'blogproject.session_backend').
+
+Django's cached_db store: reads come from the cache and fall back to the
+database, writes go to the database and then the cache. On top of that a
+save whose data is exactly what was loaded is skipped, so code that
+re-assigns an unchanged value doesn't cost a session UPDATE.
+
+The cache must be shared by every worker (Redis / Memcached in
+production, see CACHES): a per-process cache would keep serving a
+session that another worker has logged out.
+"""
+import time
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils import timezone
+
+# Rows deleted per statement by purge_expired()
+PURGE_BATCH_SIZE = 1000
+
+
+class SessionStore(CachedDBStore):
+
+    def _state(self, data):
+        return self.serializer().dumps(data)
+
+    def _unchanged(self, must_create):
+        # SESSION_SAVE_EVERY_REQUEST asks for the expiry to be pushed back on every save
+        return (
+            not must_create
+            and not settings.SESSION_SAVE_EVERY_REQUEST
+            and self.session_key is not None
+            and getattr(self, '_saved_state', None) == self._state(self._session)
+        )
+
+    def load(self):
+        data = super().load()
+        self._saved_state = self._state(data) if data else None
+        return data
+
+    async def aload(self):
+        data = await super().aload()
+        self._saved_state = self._state(data) if data else None
+        return data
+
+    def save(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        super().save(must_create)
+        self._saved_state = self._state(self._session)
+
+    async def asave(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        await super().asave(must_create)
+        self._saved_state = self._state(self._session)
+
+    @classmethod
+    def clear_expired(cls):
+        # Also what `manage.py clearsessions` runs; never one unbounded DELETE
+        purge_expired(cls.get_model_class())
+
+
+def purge_expired(model, batch_size=PURGE_BATCH_SIZE, pause=0.0):
+    """
+    Delete expired session rows `batch_size` at a time, oldest first, so no
+    single statement holds locks on a large part of the table. `pause`
+    seconds between batches gives other writers room. Returns the number
+    of rows deleted. Cache entries expire on their own.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=now)
+            .order_by('expire_date')
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += model.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
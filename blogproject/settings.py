@@ -56,13 +56,14 @@ INSTALLED_APPS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized image variants (utils/images.py): generated in a process pool on upload
+IMAGE_VARIANTS_ASYNC = True
+IMAGE_VARIANT_WORKERS = 2
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    # Development helper: clear sessions on first request so dev-server restarts
-    # don't leave users logged-in due to existing session rows + browser cookies.
-    'blogproject.middleware.ClearSessionsOnFirstRequestMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -126,6 +127,13 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Email + password in one indexed query; plain usernames (e.g. admin
+# accounts without an '@') fall through to ModelBackend.
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -150,8 +158,26 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Cache
+# Page cache generations (blogapp/page_cache.py) must be shared by every worker,
+# so production should point this at Redis or Memcached, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379/1
+# (`manage.py check --deploy` warns while it is still per-process)
+CACHES = {
+    'default': {
+        'BACKEND': str(config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')),
+        'LOCATION': str(config('CACHE_LOCATION', default='blogapp-default')),
+    }
+}
+PAGE_CACHE_TIMEOUT = 300
+
+# Login / registration / password-reset limits, counted in the cache above
+# (authentication/throttling.py). Overrides merge into its DEFAULT_RATES.
+AUTH_THROTTLE_RATES = {}
  
-MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+# Flash messages travel in a signed cookie, so messages.success() writes no session row
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 
 # Email Configuration
 # Using SMTP for actual email sending
@@ -182,6 +208,13 @@ SWAGGER_SETTINGS = {
 }
 
 REST_FRAMEWORK = {
+    # JWT first, with the user served from a per-worker cache (api/authentication.py);
+    # session and basic auth stay for the browsable API and existing clients
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     # Default permissions: allow read-only access for unauthenticated users
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -196,5 +229,9 @@ REST_FRAMEWORK = {
     )
 }
 
+# Sessions read from the cache above and skip saves that change nothing
+# (blogproject/session_backend.py)
+SESSION_ENGINE = 'blogproject.session_backend'
+
 # Expire session cookies when browser is closed to avoid persistent login across restarts
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
\ No newline at end of file
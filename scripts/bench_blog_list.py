@@ -0,0 +1,91 @@
+"""
+Compare BlogSerializer(many=True) with FastBlogListSerializer on pages of
+the blog list endpoint.
+
+	python scripts/bench_blog_list.py [--rows 100] [--repeat 50]
+
+Blogs are created inside a transaction that is rolled back at the end, so
+the database is left as it was. Each run also checks that both serializers
+render the same bytes.
+"""
+import argparse
+import os
+import sys
+import time
+import django
+
+# Ensure project root is on sys.path so Django can import the project package
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+	sys.path.insert(0, PROJECT_ROOT)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogproject.settings')
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from api.serializers import BLOG_FIELDS, BlogSerializer, FastBlogListSerializer
+from api.sparse import values_columns
+from blogapp.models import Blog
+
+
+class Rollback(Exception):
+	pass
+
+
+def timed(fn, repeat):
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--rows', type=int, default=100, help='Blogs per page (default 100)')
+	parser.add_argument('--repeat', type=int, default=50, help='Runs per variant; the best is reported')
+	args = parser.parse_args()
+
+	request = RequestFactory().get('/api/blogs/', HTTP_HOST='localhost')
+	request.user = AnonymousUser()
+	context = {'request': request, 'liked_ids': set()}
+	renderer = JSONRenderer()
+
+	try:
+		with transaction.atomic():
+			author = User.objects.create_user(username='bench-blog-list', password=None)
+			Blog.objects.bulk_create(
+				Blog(author=author, title=f'Benchmark post {i}', content='Lorem ipsum ' * 200, status='published')
+				for i in range(args.rows)
+			)
+			queryset = Blog.objects.filter(author=author).select_related('author').order_by('-created_at', '-id')
+
+			# Query + serialize + render, as the list view does it
+			def slow():
+				return renderer.render(BlogSerializer(list(queryset), many=True, context=context).data)
+
+			def fast():
+				rows = list(values_columns(queryset, BLOG_FIELDS))
+				return renderer.render(FastBlogListSerializer(rows, context=context).data)
+
+			if slow() != fast():
+				print('MISMATCH: the serializers render different output')
+				sys.exit(1)
+
+			slow_time = timed(slow, args.repeat)
+			fast_time = timed(fast, args.repeat)
+			raise Rollback
+	except Rollback:
+		pass
+
+	print(f'{args.rows} blogs per page, best of {args.repeat} runs')
+	print(f'  BlogSerializer         {slow_time * 1000:8.2f} ms')
+	print(f'  FastBlogListSerializer {fast_time * 1000:8.2f} ms  ({slow_time / fast_time:.1f}x)')
+
+
+if __name__ == '__main__':
+	main()
@@ -1,39 +1,92 @@
 import os
-import random
+import time
+import base64
+import threading
+from datetime import datetime
 from django.conf import settings
 
 
-def get_default_blog_image():
-    """
-    Returns a random default image path for blogs when no image is provided.
-    """
-    default_images = [
-        'blog_images/DSC_0476.JPG',
-        'blog_images/DSC_0528.JPG', 
-        'blog_images/DSC_0530.JPG',
-        'blog_images/IMG_20221012_125144.jpg',
-        'blog_images/IMG_20230520_182953.jpg',
-        'blog_images/IMG_20230612_154653.jpg',
-        'blog_images/IMG_20230612_154719.jpg',
-        'blog_images/IMG_20230612_175538.jpg',
-        'blog_images/IMG_20230612_175546.jpg',
-        'blog_images/IMG_20230614_125123.jpg',
-        'blog_images/IMG_20230615_060554.jpg',
-        'blog_images/IMG_20230615_183930.jpg',
-    ]
-    
-    # Check if any default images exist
-    existing_images = []
-    for image_path in default_images:
-        full_path = os.path.join(settings.MEDIA_ROOT, image_path)
-        if os.path.exists(full_path):
-            existing_images.append(image_path)
-    
-    if existing_images:
-        return random.choice(existing_images)
-    else:
+DEFAULT_BLOG_IMAGE_DIR = 'blog_images'
+
+DEFAULT_BLOG_IMAGES = [
+    'blog_images/DSC_0476.JPG',
+    'blog_images/DSC_0528.JPG', 
+    'blog_images/DSC_0530.JPG',
+    'blog_images/IMG_20221012_125144.jpg',
+    'blog_images/IMG_20230520_182953.jpg',
+    'blog_images/IMG_20230612_154653.jpg',
+    'blog_images/IMG_20230612_154719.jpg',
+    'blog_images/IMG_20230612_175538.jpg',
+    'blog_images/IMG_20230612_175546.jpg',
+    'blog_images/IMG_20230614_125123.jpg',
+    'blog_images/IMG_20230615_060554.jpg',
+    'blog_images/IMG_20230615_183930.jpg',
+]
+
+
+class DefaultImageRegistry:
+    """
+    In-memory list of the default blog images that exist on disk.
+    The directory is listed once and only re-listed when its mtime changes;
+    the mtime itself is checked at most every `recheck_interval` seconds, so
+    steady-state lookups cost no filesystem calls at all.
+    """
+
+    def __init__(self, candidates, recheck_interval=5.0):
+        self.candidates = list(candidates)
+        self.recheck_interval = recheck_interval
+        self._images = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def directory(self):
+        return os.path.join(settings.MEDIA_ROOT, DEFAULT_BLOG_IMAGE_DIR)
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._images is not None and now - self._checked_at < self.recheck_interval:
+            return
+        with self._lock:
+            try:
+                mtime = os.stat(self.directory()).st_mtime
+            except OSError:
+                mtime = None
+            self._checked_at = now
+            if not force and self._images is not None and mtime == self._mtime:
+                return
+            try:
+                present = set(os.listdir(self.directory()))
+            except OSError:
+                present = set()
+            self._images = [path for path in self.candidates if path.rsplit('/', 1)[-1] in present]
+            self._mtime = mtime
+
+    def images(self):
+        self.refresh()
+        return self._images
+
+    def choose(self, key=None):
+        """
+        Pick a default image. The same key (a blog id) always maps to the
+        same image, which keeps URLs stable across renders and workers.
+        """
         # Fallback to first image if none exist
-        return default_images[0]
+        images = self.images() or self.candidates[:1]
+        if key is None:
+            return images[0]
+        return images[int(key) % len(images)]
+
+
+default_image_registry = DefaultImageRegistry(DEFAULT_BLOG_IMAGES)
+
+
+def get_default_blog_image(key=None):
+    """
+    Returns a default image path for blogs when no image is provided,
+    chosen deterministically from `key` (normally the blog id).
+    """
+    return default_image_registry.choose(key)
 
 
 def get_blog_image_or_default(image_field):
@@ -49,17 +102,24 @@ def validate_image_file(file):
     """
     Validates uploaded image file.
     Returns True if valid, False otherwise.
+    Files received by utils.uploads.ImageUploadHandler were already checked
+    (magic bytes, size and a Pillow verify) while streaming, so they are not
+    inspected again.
     """
     if not file:
         return True  # No file is valid (will use default)
     
+    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
+    sniffed = getattr(file, 'sniffed_content_type', None)
+    if sniffed:
+        return sniffed in allowed_types
+
     # Check file size (max 5MB)
     max_size = 5 * 1024 * 1024  # 5MB
     if file.size > max_size:
         return False
     
     # Check file type
-    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
     if file.content_type not in allowed_types:
         return False
     
@@ -70,23 +130,27 @@ def send_email_notification(subject, message, recipient_email, from_email=None):
     """
     Common function to send email notifications.
     Can be reused across different apps.
+    The email is queued in the outbox (inside the caller's transaction, if any)
+    and delivered by the `send_outbox` worker, so requests never wait on SMTP.
     """
-    from django.core.mail import send_mail
-    
+    from django.db import transaction
+    from blogapp.models import OutboxEmail
+
     if not from_email:
         from_email = settings.DEFAULT_FROM_EMAIL
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=from_email,
-            recipient_list=[recipient_email],
-            fail_silently=False,
-        )
+        # Savepoint so a failed insert doesn't poison the caller's transaction
+        with transaction.atomic():
+            OutboxEmail.objects.create(
+                subject=subject,
+                body=message,
+                from_email=from_email,
+                to=recipient_email,
+            )
         return True
     except Exception as e:
-        print(f"Email sending failed: {e}")
+        print(f"Email queueing failed: {e}")
         return False
 
 
@@ -120,3 +184,30 @@ def get_user_display_name(user):
         return user.first_name
     else:
         return user.username
+
+
+
+def encode_cursor(created_at, pk, reverse=False):
+    """
+    Build an opaque keyset cursor from a (created_at, id) position.
+    `reverse` marks a cursor that walks backwards (a "previous" link).
+    """
+    raw = f"{created_at.isoformat()}|{pk}" + ("|r" if reverse else "")
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Parse a cursor produced by encode_cursor.
+    Returns (created_at, pk, reverse) or None if the token is missing or malformed.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] != 'r'):
+            return None
+        return datetime.fromisoformat(parts[0]), int(parts[1]), len(parts) == 3
+    except (ValueError, UnicodeDecodeError):
+        return None
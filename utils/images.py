@@ -0,0 +1,160 @@
+# Resized variants of blog images (thumbnails / responsive srcset)
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from django.conf import settings
+
+# Widths (px) generated for every blog image
+VARIANT_WIDTHS = (320, 640, 1024)
+
+# Output formats; WebP first because browsers that support it get it via <picture>
+VARIANT_FORMATS = ('webp', 'jpeg')
+
+# Folder under MEDIA_ROOT that holds all generated variants
+VARIANT_DIR = 'variants'
+
+_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+_QUALITY = {'webp': 80, 'jpeg': 82}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, width, fmt):
+    """
+    Storage name of one variant. The source name (with its extension) is kept
+    so the variant URL alone is enough to find the original again.
+    e.g. 'photo.png' -> 'variants/640/photo.png.webp'
+    """
+    return f"{VARIANT_DIR}/{width}/{name}.{_EXTENSIONS[fmt]}"
+
+
+def source_name(variant_path):
+    """
+    Inverse of variant_name for the part after 'variants/<width>/'.
+    Returns (source name, format) or (None, None) if it isn't a variant name
+    of an image variants may be made from (see is_variant_source).
+    """
+    stem, _, ext = variant_path.rpartition('.')
+    for fmt, fmt_ext in _EXTENSIONS.items():
+        if ext.lower() == fmt_ext and is_variant_source(stem):
+            return stem, fmt
+    return None, None
+
+
+def is_variant_source(name):
+    """
+    Only uploaded (content-addressed) images and the default images get
+    variants. Anything else, in particular an earlier variant, is refused,
+    so requests can't chain variants/<w>/variants/<w>/... to fill the disk.
+    """
+    from utils.common import DEFAULT_BLOG_IMAGES
+    from utils.storage import is_hashed_name
+
+    return name in DEFAULT_BLOG_IMAGES or is_hashed_name(name)
+
+
+def variant_url(name, width, fmt, base_url=''):
+    return f"{base_url}{settings.MEDIA_URL}{variant_name(name, width, fmt)}"
+
+
+def srcset(name, fmt, base_url=''):
+    """
+    srcset attribute value listing every width of one format.
+    `base_url` (scheme + host) makes the URLs absolute, e.g. for API clients.
+    """
+    return ', '.join(f"{variant_url(name, width, fmt, base_url)} {width}w" for width in VARIANT_WIDTHS)
+
+
+def srcset_builder(fmt, base_url=''):
+    """
+    srcset() for many names sharing one format and base URL: the URL parts
+    around the name are worked out once and the returned function only joins.
+    """
+    parts = [
+        (f"{base_url}{settings.MEDIA_URL}{VARIANT_DIR}/{width}/", f".{_EXTENSIONS[fmt]} {width}w")
+        for width in VARIANT_WIDTHS
+    ]
+
+    def build(name):
+        return ', '.join([f"{prefix}{name}{suffix}" for prefix, suffix in parts])
+    return build
+
+
+def render_variant(source_path, dest_path, width, fmt):
+    """
+    Write one resized copy of source_path to dest_path. Images are never
+    upscaled; the file is written to a temp name first so readers never see
+    a partial image. Raises OSError for unreadable sources, decompression
+    bombs (over PIL's MAX_IMAGE_PIXELS) included.
+    """
+    from PIL import Image, ImageOps
+
+    # Unique per call: threads of one worker may render the same variant at once
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            image.save(tmp_path, format=fmt.upper(), quality=_QUALITY[fmt], optimize=True)
+        os.replace(tmp_path, dest_path)
+    except Image.DecompressionBombError as e:
+        # Not an OSError subclass; callers only expect OSError
+        raise OSError(str(e)) from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_variants(name, media_root):
+    """
+    Create any missing variants of the image stored as `name`.
+    Only plain arguments are used so this can run in a worker process.
+    Returns the list of variant names written.
+    """
+    source_path = os.path.join(media_root, name)
+    if not os.path.exists(source_path):
+        return []
+    written = []
+    for width in VARIANT_WIDTHS:
+        for fmt in VARIANT_FORMATS:
+            dest = variant_name(name, width, fmt)
+            dest_path = os.path.join(media_root, dest)
+            if os.path.exists(dest_path):
+                continue
+            render_variant(source_path, dest_path, width, fmt)
+            written.append(dest)
+    return written
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' keeps the pool independent of the web worker's threads and DB connections
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                mp_context=get_context('spawn'),
+            )
+        return _executor
+
+
+def schedule_variants(name):
+    """
+    Generate variants for a freshly uploaded image, in the process pool unless
+    IMAGE_VARIANTS_ASYNC is off (then inline, e.g. for tests).
+    """
+    if not name:
+        return
+    media_root = str(settings.MEDIA_ROOT)
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        _get_executor().submit(generate_variants, name, media_root)
+    else:
+        generate_variants(name, media_root)
@@ -0,0 +1,149 @@
+# Content-addressed storage for uploaded blog images
+import hashlib
+import os
+import re
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from utils.uploads import IMAGE_EXTENSIONS, sniff_image_type
+
+# Folder under MEDIA_ROOT holding content-addressed files
+CAS_DIR = 'images'
+
+# Exactly what hashed_name() produces: images/ab/cd/<sha256>.<image ext>
+_HASHED_NAME_RE = re.compile(
+    rf"{CAS_DIR}/([0-9a-f]{{2}})/([0-9a-f]{{2}})/\1\2[0-9a-f]{{60}}\.(?:jpg|png|gif|webp)"
+)
+
+
+def content_hash(content):
+    """
+    SHA-256 hex digest of an uploaded file, read in chunks.
+    Reuses the digest computed while streaming (utils.uploads) when present.
+    """
+    precomputed = getattr(content, 'sha256', None)
+    if precomputed:
+        return precomputed
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def image_content_type(content):
+    """
+    The sniffed image type of an upload: the one utils.uploads recorded while
+    streaming, or read from the first bytes. None for anything else.
+    """
+    sniffed = getattr(content, 'sniffed_content_type', None)
+    if sniffed:
+        return sniffed
+    content.seek(0)
+    header = content.read(16)
+    content.seek(0)
+    return sniff_image_type(header)
+
+
+def hashed_name(digest, content_type):
+    """
+    Sharded storage name for a digest: images/ab/cd/abcd....jpg
+    Two levels of 256 directories keep each directory small even with
+    millions of files. The extension follows the sniffed content type, so
+    the web server can only ever serve these files as images.
+    """
+    return f"{CAS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{IMAGE_EXTENSIONS[content_type]}"
+
+
+def is_hashed_name(name):
+    # Full match, so paths like images/../variants/... never qualify
+    return bool(name) and _HASHED_NAME_RE.fullmatch(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Filesystem storage that names files by the SHA-256 of their content.
+    Identical uploads map to the same name, so their bytes are stored once;
+    MediaBlob keeps a reference count per name and the file is removed when
+    the last blog using it lets go (see release()).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content in _save(); never add random suffixes
+        return name
+
+    def _save(self, name, content):
+        from blogapp.models import MediaBlob
+
+        content_type = image_content_type(content)
+        if content_type not in IMAGE_EXTENSIONS:
+            raise SuspiciousFileOperation(f"{name} is not a JPEG, PNG, GIF or WebP image")
+        name = hashed_name(content_hash(content), content_type)
+        if not self.exists(name):
+            self._write_once(name, content)
+        # Reference taken in the caller's transaction, next to the row that points at the file
+        MediaBlob.objects.bulk_create([MediaBlob(name=name, size=content.size)], ignore_conflicts=True)
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+        return name
+
+    def _write_once(self, name, content):
+        """
+        Create the file for `name` unless it already exists. Two uploads of
+        the same bytes can both get past exists(); O_EXCL lets exactly one
+        of them write and the other finds the (identical) file in place.
+        """
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            fd = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        except FileExistsError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+        except BaseException:
+            # Never leave a truncated file under a content hash
+            os.remove(full_path)
+            raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def release(self, name):
+        """
+        Drop one reference to `name`; delete the file (and its variants) once
+        nothing refers to it any more. Names outside the content-addressed
+        folder (e.g. default images) are never touched.
+        """
+        from blogapp.models import MediaBlob
+
+        if not is_hashed_name(name):
+            return
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        deleted, _ = MediaBlob.objects.filter(name=name, refcount=0).delete()
+        if deleted:
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        from blogapp.models import MediaBlob
+        from utils.images import VARIANT_FORMATS, VARIANT_WIDTHS, variant_name
+
+        # The same bytes may have been uploaded again since the row was dropped
+        if MediaBlob.objects.filter(name=name).exists():
+            return
+        self.delete(name)
+        for width in VARIANT_WIDTHS:
+            for fmt in VARIANT_FORMATS:
+                self.delete(variant_name(name, width, fmt))
+
+
+blog_image_storage = ContentAddressedStorage()
+
+
+def get_blog_image_storage():
+    # Callable so migrations reference it instead of serializing the instance
+    return blog_image_storage
@@ -0,0 +1,153 @@
+# Streaming upload handling for blog images
+import hashlib
+from functools import wraps
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+# Largest accepted image upload (5MB)
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
+# Leading bytes identifying each accepted image type
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+# Extension stored for each accepted type; never taken from the client's filename
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+
+def sniff_image_type(header):
+    """
+    Returns the image content type from the first bytes of a file, or None.
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    # WebP: 'RIFF' <size> 'WEBP'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def verify_image(file):
+    """
+    True when Pillow can parse the whole file as an image. Catches uploads
+    whose header is valid but whose body is truncated or corrupt.
+    """
+    from PIL import Image
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            image.verify()
+    except Exception:
+        # Pillow signals bad data with OSError, SyntaxError, ValueError, ...
+        return False
+    finally:
+        file.seek(0)
+    return True
+
+
+def upload_rejection(request, field_name):
+    """
+    Reason an uploaded file was refused by ImageUploadHandler, or None.
+    """
+    return getattr(request, 'upload_rejections', {}).get(field_name)
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler that checks images while they stream in.
+
+    The first chunk is checked against known image signatures, the running
+    size is capped at MAX_IMAGE_SIZE and a SHA-256 is computed on the fly, so
+    invalid uploads are dropped without being buffered and valid ones never
+    need to be read again (the digest is reused by the content-addressed
+    storage). Once complete the spooled file is verified with Pillow.
+    Rejected files are left out of request.FILES and their reason is
+    recorded in request.upload_rejections; other form fields still parse.
+
+    Every file in the request is treated as an image, so the handler is only
+    installed by views that take image uploads (@image_uploads,
+    ImageUploadMixin), never site-wide.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.digest = hashlib.sha256()
+        self.received = 0
+        self.sniffed_content_type = None
+        raise StopFutureHandlers()
+
+    def record_rejection(self, reason):
+        if not hasattr(self.request, 'upload_rejections'):
+            self.request.upload_rejections = {}
+        self.request.upload_rejections[self.field_name] = reason
+        self.file.close()
+
+    def reject(self, reason):
+        self.record_rejection(reason)
+        # Skip the rest of this part without storing it; later fields still parse
+        raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            self.sniffed_content_type = sniff_image_type(raw_data[:16])
+            if self.sniffed_content_type is None:
+                self.reject("File is not a JPEG, PNG, GIF or WebP image.")
+        self.received += len(raw_data)
+        if self.received > MAX_IMAGE_SIZE:
+            self.reject("Image is larger than 5MB.")
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if file_size == 0:
+            # Empty file inputs are just "no file"
+            self.file.close()
+            return None
+        if not verify_image(self.file):
+            self.record_rejection("File is not a valid image.")
+            return None
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        self.file.sniffed_content_type = self.sniffed_content_type
+        return self.file
+
+
+def image_uploads(view):
+    """
+    Parse the uploads of a function view with ImageUploadHandler.
+
+    Handlers can only be swapped before the body is read, and
+    CsrfViewMiddleware reads POST bodies before the view runs, so the view is
+    exempted from the middleware and CSRF-checked here after the swap.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+class ImageUploadMixin:
+    """Parse the uploads of a DRF view with ImageUploadHandler."""
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Before authentication, whose CSRF check may already read the body
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)